@@ -6,6 +6,7 @@ from datetime import date
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy import or_
 from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
@@ -14,6 +15,11 @@ from app.models.hb import HBContract
 
 router = APIRouter(prefix="/api/additional-charges", tags=["additional-charges"])
 
+# 전표 생성 시 비용 건마다 비교하므로 Enum .value 조회를 모듈 로드 시 한 번만 수행
+_RECURRING = RecurrenceType.RECURRING.value
+_ONE_TIME = RecurrenceType.ONE_TIME.value
+_PERIOD = RecurrenceType.PERIOD.value
+
 
 # ===== Request/Response 모델 =====
 
@@ -227,25 +233,8 @@ def get_charges_by_contract(
     }
 
 
-def get_applicable_charges(
-    db: Session,
-    contract_seq: int,
-    billing_cycle: str,
-    slip_type: str,
-) -> list[AdditionalCharge]:
-    """
-    특정 정산월/전표유형에 적용되는 추가 비용 목록 조회
-
-    Args:
-        db: DB 세션
-        contract_seq: 계약 seq
-        billing_cycle: 정산월 (YYYYMM)
-        slip_type: 전표 유형 (sales/purchase)
-
-    Returns:
-        적용 가능한 AdditionalCharge 목록
-    """
-    # 정산월을 날짜 범위로 변환
+def _get_cycle_range(billing_cycle: str) -> tuple[date, date]:
+    """정산월을 날짜 범위로 변환 [시작일, 다음달 1일)"""
     year = int(billing_cycle[:4])
     month = int(billing_cycle[4:6])
     cycle_start = date(year, month, 1)
@@ -253,50 +242,79 @@ def get_applicable_charges(
         cycle_end = date(year + 1, 1, 1)
     else:
         cycle_end = date(year, month + 1, 1)
-
+    return cycle_start, cycle_end
+
+
+def _is_charge_applicable(c: AdditionalCharge, cycle_start: date, cycle_end: date) -> bool:
+    """반복 유형 및 기간 기준 정산월 적용 여부"""
+    if c.recurrence_type == _RECURRING:
+        # 매월 반복: start_date 이후, end_date 이전인지 체크
+        if c.start_date and c.start_date > cycle_start:
+            return False
+        if c.end_date and c.end_date < cycle_start:
+            return False
+        return True
+
+    elif c.recurrence_type == _ONE_TIME:
+        # 일회성: start_date가 정산월 내인지 체크
+        # start_date 없으면 적용 안함 (수동 확인 필요)
+        return bool(c.start_date) and cycle_start <= c.start_date < cycle_end
+
+    elif c.recurrence_type == _PERIOD:
+        # 기간 지정: 정산월이 start~end 범위 내인지 체크
+        if c.start_date and c.end_date:
+            if c.start_date <= cycle_start and cycle_end <= c.end_date:
+                return True
+            elif c.start_date <= cycle_start < c.end_date:
+                # 부분 적용 (마지막 달)
+                return True
+            elif cycle_start <= c.start_date < cycle_end:
+                # 부분 적용 (첫 달)
+                return True
+
+    return False
+
+
+def _active_charges_query(db: Session, slip_type: str, cycle_end: date):
+    """활성 + 매출/매입 적용 대상 추가 비용 쿼리"""
+    # 정산월 이후에 시작하는 비용은 어떤 반복 유형이든 적용 대상이 아니므로 SQL에서 제외
+    # (종료일 조건은 유형마다 달라 _is_charge_applicable에서 체크)
     query = db.query(AdditionalCharge).filter(
-        AdditionalCharge.contract_seq == contract_seq,
         AdditionalCharge.is_active == True,
+        or_(AdditionalCharge.start_date.is_(None), AdditionalCharge.start_date < cycle_end),
     )
 
     # 매출/매입 적용 필터
     if slip_type == "sales":
-        query = query.filter(AdditionalCharge.applies_to_sales == True)
-    else:  # purchase
-        query = query.filter(AdditionalCharge.applies_to_purchase == True)
+        return query.filter(AdditionalCharge.applies_to_sales == True)
+    return query.filter(AdditionalCharge.applies_to_purchase == True)
+
+
+def get_applicable_charges_bulk(
+    db: Session,
+    contract_seqs: set[int],
+    billing_cycle: str,
+    slip_type: str,
+) -> dict[int, list[AdditionalCharge]]:
+    """
+    여러 계약의 적용 추가 비용을 한 번에 조회 (전표 생성 배치용)
 
-    charges = query.all()
+    Returns:
+        계약 seq → 적용 가능한 AdditionalCharge 목록 (적용 비용이 없는 계약은 제외)
+    """
+    if not contract_seqs:
+        return {}
+
+    cycle_start, cycle_end = _get_cycle_range(billing_cycle)
+    charges = (
+        _active_charges_query(db, slip_type, cycle_end)
+        .filter(AdditionalCharge.contract_seq.in_(contract_seqs))
+        .order_by(AdditionalCharge.id)
+        .all()
+    )
 
-    # 반복 유형 및 기간 체크하여 필터링
-    applicable = []
+    by_contract: dict[int, list[AdditionalCharge]] = {}
     for c in charges:
-        if c.recurrence_type == RecurrenceType.RECURRING.value:
-            # 매월 반복: start_date 이후, end_date 이전인지 체크
-            if c.start_date and c.start_date > cycle_start:
-                continue
-            if c.end_date and c.end_date < cycle_start:
-                continue
-            applicable.append(c)
-
-        elif c.recurrence_type == RecurrenceType.ONE_TIME.value:
-            # 일회성: start_date가 정산월 내인지 체크
-            if c.start_date:
-                if cycle_start <= c.start_date < cycle_end:
-                    applicable.append(c)
-            else:
-                # start_date 없으면 적용 안함 (수동 확인 필요)
-                pass
-
-        elif c.recurrence_type == RecurrenceType.PERIOD.value:
-            # 기간 지정: 정산월이 start~end 범위 내인지 체크
-            if c.start_date and c.end_date:
-                if c.start_date <= cycle_start and cycle_end <= c.end_date:
-                    applicable.append(c)
-                elif c.start_date <= cycle_start < c.end_date:
-                    # 부분 적용 (마지막 달)
-                    applicable.append(c)
-                elif cycle_start <= c.start_date < cycle_end:
-                    # 부분 적용 (첫 달)
-                    applicable.append(c)
-
-    return applicable
+        if _is_charge_applicable(c, cycle_start, cycle_end):
+            by_contract.setdefault(c.contract_seq, []).append(c)
+    return by_contract
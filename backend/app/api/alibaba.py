@@ -1,5 +1,4 @@
 import csv
-import io
 from typing import Literal
 
 from fastapi import APIRouter, Depends, File, Query, UploadFile
@@ -8,7 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.alibaba import AlibabaBilling
-from app.utils import clean_string, decode_csv_content, parse_float
+from app.utils import clean_string, decode_csv_stream, parse_float
 
 router = APIRouter(prefix="/api/alibaba", tags=["alibaba"])
 
@@ -27,9 +26,7 @@ async def upload_alibaba_billing(
     - reseller: Original Cost - Discount - SPN Deducted Price 사용 (쿠폰 이슈 대응)
     """
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
 
     inserted = 0
     errors = []
@@ -6,13 +6,17 @@ from datetime import date
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.billing_profile import CompanyBillingProfile, Deposit, DepositUsage, PaymentType
 from app.models.hb import HBCompany
-from app.services.deposit import deposit_fifo_use, get_deposit_balance_info, update_deposit_fields
+from app.services.deposit import (
+    active_balance_subquery,
+    deposit_fifo_use,
+    get_deposit_balance_info,
+    update_deposit_fields,
+)
 from app.utils import round_decimal
 
 router = APIRouter(prefix="/api/billing-profile", tags=["billing-profile"])
@@ -417,19 +421,21 @@ def create_billing_profile(data: BillingProfileCreate, db: Session = Depends(get
 @router.get("/{profile_id}")
 def get_billing_profile(profile_id: int, db: Session = Depends(get_db)):
     """청구 프로필 상세 조회"""
-    profile = db.query(CompanyBillingProfile).filter(CompanyBillingProfile.id == profile_id).first()
-    if not profile:
+    # 예치금 잔액은 프로필과 같은 쿼리에서 서브쿼리로 계산
+    row = (
+        db.query(
+            CompanyBillingProfile,
+            active_balance_subquery(Deposit.profile_id, CompanyBillingProfile.id),
+        )
+        .filter(CompanyBillingProfile.id == profile_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(status_code=404, detail="Profile not found")
+    profile, deposit_balance = row
 
     company = db.query(HBCompany).filter(HBCompany.seq == profile.company_seq).first()
 
-    # 예치금 잔액 계산
-    deposit_balance = (
-        db.query(func.sum(Deposit.remaining_amount))
-        .filter(Deposit.profile_id == profile_id, Deposit.is_exhausted == False)
-        .scalar()
-    ) or 0
-
     return {
         "id": profile.id,
         "company_seq": profile.company_seq,
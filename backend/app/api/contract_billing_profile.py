@@ -6,18 +6,22 @@ from datetime import date
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.billing_profile import (
     ContractBillingProfile,
     Deposit,
-    PAYMENT_TYPE_TAX_CODE,
     PaymentType,
+    tax_code_for,
 )
 from app.models.hb import HBCompany, HBContract
-from app.services.deposit import deposit_fifo_use, get_deposit_balance_info, update_deposit_fields
+from app.services.deposit import (
+    active_balance_subquery,
+    deposit_fifo_use,
+    get_deposit_balance_info,
+    update_deposit_fields,
+)
 from app.utils import round_decimal
 
 router = APIRouter(prefix="/api/contract-billing-profile", tags=["contract-billing-profile"])
@@ -117,7 +121,7 @@ def get_contract_billing_profiles(
                 "company_name": company.name if company else None,
                 "vendor": p.vendor,
                 "payment_type": p.payment_type,
-                "tax_code": PAYMENT_TYPE_TAX_CODE.get(p.payment_type, "A1"),
+                "tax_code": tax_code_for(p.payment_type),
                 "has_sales_agreement": p.has_sales_agreement,
                 "has_purchase_agreement": p.has_purchase_agreement,
                 "currency": p.currency,
@@ -182,7 +186,7 @@ def get_contracts_with_profiles(
                 "profile": {
                     "id": profile.id,
                     "payment_type": profile.payment_type,
-                    "tax_code": PAYMENT_TYPE_TAX_CODE.get(profile.payment_type, "A1"),
+                    "tax_code": tax_code_for(profile.payment_type),
                     "currency": profile.currency,
                     "exchange_rate_type": profile.exchange_rate_type,
                     "has_sales_agreement": profile.has_sales_agreement,
@@ -239,11 +243,18 @@ def create_contract_billing_profile(
 @router.get("/{profile_id}")
 def get_contract_billing_profile(profile_id: int, db: Session = Depends(get_db)):
     """계약별 청구 프로필 상세 조회"""
-    profile = (
-        db.query(ContractBillingProfile).filter(ContractBillingProfile.id == profile_id).first()
+    # 예치금 잔액은 프로필과 같은 쿼리에서 서브쿼리로 계산
+    row = (
+        db.query(
+            ContractBillingProfile,
+            active_balance_subquery(Deposit.contract_profile_id, ContractBillingProfile.id),
+        )
+        .filter(ContractBillingProfile.id == profile_id)
+        .first()
     )
-    if not profile:
+    if not row:
         raise HTTPException(status_code=404, detail="Profile not found")
+    profile, deposit_balance = row
 
     contract = db.query(HBContract).filter(HBContract.seq == profile.contract_seq).first()
     company = (
@@ -252,13 +263,6 @@ def get_contract_billing_profile(profile_id: int, db: Session = Depends(get_db))
         else None
     )
 
-    # 예치금 잔액 계산
-    deposit_balance = (
-        db.query(func.sum(Deposit.remaining_amount))
-        .filter(Deposit.contract_profile_id == profile_id, Deposit.is_exhausted == False)
-        .scalar()
-    ) or 0
-
     return {
         "id": profile.id,
         "contract_seq": profile.contract_seq,
@@ -268,7 +272,7 @@ def get_contract_billing_profile(profile_id: int, db: Session = Depends(get_db))
         "is_overseas": company.is_overseas if company else False,
         "vendor": profile.vendor,
         "payment_type": profile.payment_type,
-        "tax_code": PAYMENT_TYPE_TAX_CODE.get(profile.payment_type, "A1"),
+        "tax_code": tax_code_for(profile.payment_type),
         "has_sales_agreement": profile.has_sales_agreement,
         "has_purchase_agreement": profile.has_purchase_agreement,
         "currency": profile.currency,
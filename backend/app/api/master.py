@@ -1,12 +1,11 @@
 import csv
-import io
 
 from fastapi import APIRouter, Depends, File, Query, UploadFile
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.alibaba import AccountCode, BPCode, ContractCode, CostCenter, TaxCode
-from app.utils import clean_string, decode_csv_content
+from app.utils import clean_string, decode_csv_stream
 
 router = APIRouter(prefix="/api/master", tags=["master"])
 
@@ -18,9 +17,7 @@ async def upload_bp_codes(
 ):
     """BP Code 마스터 업로드 (BP_CODE.CSV)"""
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
     inserted = 0
     updated = 0
     errors = []
@@ -141,9 +138,7 @@ async def upload_account_codes(
 ):
     """계정코드 마스터 업로드"""
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
     inserted = 0
     errors = []
 
@@ -209,9 +204,7 @@ async def upload_tax_codes(
 ):
     """세금코드 마스터 업로드"""
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
     inserted = 0
 
     for row in reader:
@@ -261,9 +254,7 @@ async def upload_cost_centers(
 ):
     """부서(코스트센터) 마스터 업로드"""
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
     inserted = 0
 
     for row in reader:
@@ -323,9 +314,7 @@ async def upload_contracts(
 ):
     """계약번호 마스터 업로드"""
     content = await file.read()
-    text = decode_csv_content(content)
-
-    reader = csv.DictReader(io.StringIO(text))
+    reader = csv.DictReader(decode_csv_stream(content))
     inserted = 0
 
     for row in reader:
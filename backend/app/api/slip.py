@@ -2,26 +2,30 @@
 전표 생성 및 관리 API
 """
 
+import asyncio
 import csv
 import io
+import queue
+import threading
 import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
 from datetime import date, datetime, timedelta
 from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import Row, bindparam, case, delete, func, insert, or_, select, update
 from sqlalchemy.orm import Session, joinedload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.alibaba import AlibabaBilling, BPCode
 from app.models.billing_profile import (
     CompanyBillingProfile,
     ContractBillingProfile,
     Deposit,
     DepositUsage,
-    PAYMENT_TYPE_TAX_CODE,
+    tax_code_for,
 )
 from app.models.hb import AccountContractMapping, HBCompany, HBContract, HBVendorAccount
 from app.utils import apply_rounding, round_decimal
@@ -30,6 +34,7 @@ from app.models.slip import (
     ExchangeRateDateRule,
     ExchangeRateType,
     RoundingRule,
+    SlipBatch,
     SlipConfig,
     SlipRecord,
     SlipSourceType,
@@ -37,6 +42,17 @@ from app.models.slip import (
 
 router = APIRouter(prefix="/api/slip", tags=["slip"])
 
+# 환율 upsert 시 기존 행 조회 (행마다 쿼리를 새로 만들지 않고 파라미터만 바꿔 실행)
+_EXCHANGE_RATE_LOOKUP = (
+    select(ExchangeRate)
+    .where(
+        ExchangeRate.rate_date == bindparam("rate_date"),
+        ExchangeRate.currency_from == bindparam("currency_from"),
+        ExchangeRate.currency_to == "KRW",
+    )
+    .limit(1)
+)
+
 
 def _upsert_exchange_rate(db: Session, row: dict) -> bool:
     """환율 row를 upsert하고, 신규 삽입이면 True, 업데이트면 False 반환"""
@@ -47,15 +63,9 @@ def _upsert_exchange_rate(db: Session, row: dict) -> bool:
     rate_date = datetime.strptime(rate_date_str, "%Y-%m-%d").date()
     currency_code = row.get("code", "USD")
 
-    existing = (
-        db.query(ExchangeRate)
-        .filter(
-            ExchangeRate.rate_date == rate_date,
-            ExchangeRate.currency_from == currency_code,
-            ExchangeRate.currency_to == "KRW",
-        )
-        .first()
-    )
+    existing = db.scalars(
+        _EXCHANGE_RATE_LOOKUP, {"rate_date": rate_date, "currency_from": currency_code}
+    ).first()
 
     basic_rate = float(row.get("basic_rate", 0))
     send_rate = float(row.get("send_rate", 0))
@@ -468,8 +478,26 @@ def calculate_exchange_rate_date(
         return document_date
 
 
+def _default_rate_rule(document_date: date, billing_first_day: date) -> date:
+    return document_date
+
+
+# 계약별 해외 환율 적용일 규칙 (증빙일, 정산월 1일) -> 환율 조회일
+_CONTRACT_RATE_RULES = {
+    ExchangeRateDateRule.DOCUMENT_DATE.value: _default_rate_rule,
+    ExchangeRateDateRule.FIRST_OF_DOCUMENT_MONTH.value: lambda d, b: d.replace(day=1),
+    ExchangeRateDateRule.FIRST_OF_BILLING_MONTH.value: lambda d, b: b,
+    ExchangeRateDateRule.LAST_OF_PREV_MONTH.value: (
+        lambda d, b: d.replace(day=1) - timedelta(days=1)
+    ),
+}
+
+
 def _sync_exchange_rates_from_hb_internal(db: Session, limit: int = 50) -> int:
-    """HB API에서 환율 데이터 동기화 (내부 헬퍼)"""
+    """HB API에서 환율 데이터 동기화 (내부 헬퍼)
+
+    전표 생성 중에 호출되므로 커밋하지 않고 flush만 함 (전표 생성 트랜잭션과 함께 커밋)
+    """
     import requests
 
     HB_API_URL = "https://alibabacloud.hyperbilling.kr/admin/api/v1/ccy/exchangerate"
@@ -505,7 +533,7 @@ def _sync_exchange_rates_from_hb_internal(db: Session, limit: int = 50) -> int:
     for row in rows:
         _upsert_exchange_rate(db, row)
 
-    db.commit()
+    db.flush()
     return len(rows)
 
 
@@ -724,6 +752,239 @@ class SlipGenerateRequest(BaseModel):
     overseas_exchange_rate_input: float | None = None  # 해외 인보이스 기본 환율 (계약별 설정 없을 때 사용)
 
 
+def _resolve_overseas_rate(
+    db: Session,
+    data: SlipGenerateRequest,
+    contract_billing_profile: ContractBillingProfile | None,
+    billing_first_day: date,
+    overseas_exchange_rate: float | None,
+    contract_rate_cache: dict[date, float | None],
+) -> float | None:
+    """
+    해외법인 계약별 원화환산 환율 결정
+
+    우선순위: 1) 계약별 프로필 환율 설정 → 2) 슬립 생성 시 지정 해외 환율 → 3) 글로벌 해외 환율
+
+    contract_rate_cache: 환율 조회일 → 기준환율 (배치 내 조회일이 겹치므로 일자별 1회만 조회)
+    """
+    # 1. 계약별 청구 프로필 환율 설정 확인
+    if contract_billing_profile and (
+        contract_billing_profile.exchange_rate_type
+        or contract_billing_profile.custom_exchange_rate_date
+    ):
+        rate_lookup_date = contract_billing_profile.custom_exchange_rate_date
+        if not rate_lookup_date and contract_billing_profile.exchange_rate_type:
+            rate_rule = _CONTRACT_RATE_RULES.get(
+                contract_billing_profile.exchange_rate_type, _default_rate_rule
+            )
+            rate_lookup_date = rate_rule(data.document_date, billing_first_day)
+
+        if rate_lookup_date:
+            if rate_lookup_date not in contract_rate_cache:
+                contract_rate_record = (
+                    db.query(ExchangeRate.basic_rate, ExchangeRate.rate)
+                    .filter(
+                        ExchangeRate.rate_date == rate_lookup_date,
+                        ExchangeRate.currency_from == "USD",
+                        ExchangeRate.currency_to == "KRW",
+                    )
+                    .first()
+                )
+                rate_val = (
+                    (contract_rate_record.basic_rate or contract_rate_record.rate)
+                    if contract_rate_record
+                    else None
+                )
+                contract_rate_cache[rate_lookup_date] = float(rate_val) if rate_val else None
+            if contract_rate_cache[rate_lookup_date]:
+                return contract_rate_cache[rate_lookup_date]
+
+    # 2. 계약별 환율 없으면 슬립 생성 시 지정한 해외 환율 사용
+    if data.overseas_exchange_rate_input:
+        return data.overseas_exchange_rate_input
+
+    # 3. 그것도 없으면 글로벌 해외 환율 사용
+    return overseas_exchange_rate
+
+
+def _load_billing_profiles(
+    db: Session, accounts
+) -> tuple[
+    dict[int, ContractBillingProfile], dict[int, CompanyBillingProfile], dict[int, list[Deposit]]
+]:
+    """
+    UID 계정들에 연결된 계약/회사의 alibaba 청구 프로필과 계약 프로필별 외화 예치금 일괄 조회
+
+    Returns:
+        (계약 seq → 계약 프로필, 회사 seq → 회사 프로필, 계약 프로필 ID → 미소진 외화 예치금 (충전일 순))
+    """
+    contract_seqs = set()
+    company_seqs = set()
+    for account in accounts:
+        for mapping in account.contract_mappings:
+            if mapping.contract:
+                contract_seqs.add(mapping.contract.seq)
+                if mapping.contract.company_seq is not None:
+                    company_seqs.add(mapping.contract.company_seq)
+
+    contract_profiles_by_seq = {}
+    if contract_seqs:
+        contract_profiles_by_seq = {
+            p.contract_seq: p
+            for p in db.query(ContractBillingProfile).filter(
+                ContractBillingProfile.contract_seq.in_(contract_seqs),
+                ContractBillingProfile.vendor == "alibaba",
+            )
+        }
+
+    company_profiles_by_seq = {}
+    if company_seqs:
+        company_profiles_by_seq = {
+            p.company_seq: p
+            for p in db.query(CompanyBillingProfile).filter(
+                CompanyBillingProfile.company_seq.in_(company_seqs),
+                CompanyBillingProfile.vendor == "alibaba",
+            )
+        }
+
+    deposits_by_profile: dict[int, list[Deposit]] = {}
+    if contract_profiles_by_seq:
+        deposits = (
+            db.query(Deposit)
+            .filter(
+                Deposit.contract_profile_id.in_([p.id for p in contract_profiles_by_seq.values()]),
+                Deposit.is_exhausted == False,
+                Deposit.currency != "KRW",
+            )
+            .order_by(Deposit.deposit_date, Deposit.id)
+        )
+        for deposit in deposits:
+            deposits_by_profile.setdefault(deposit.contract_profile_id, []).append(deposit)
+
+    return contract_profiles_by_seq, company_profiles_by_seq, deposits_by_profile
+
+
+def _convert_overseas_amount(
+    db: Session,
+    data: SlipGenerateRequest,
+    batch_id: str,
+    uid: str,
+    amount_usd: float,
+    effective_overseas_rate: float | None,
+    available_deposits: list[Deposit],
+) -> int | None:
+    """
+    해외법인 원화환산액(DMBTR_C) 계산 (해외 인보이스 원화환산은 반올림 적용)
+
+    계약별 청구 프로필에 외화 예치금이 있으면 FIFO로 차감하며 예치금별 환율을 적용하고,
+    없으면 유효 환율로 환산합니다. 환율이 없으면 None을 반환합니다.
+
+    available_deposits: 계약 프로필의 미소진 외화 예치금 (충전일 순, 배치 시작 시 일괄 조회)
+    """
+    if not available_deposits:
+        if effective_overseas_rate and effective_overseas_rate > 0:
+            return apply_rounding(amount_usd * effective_overseas_rate, "round_half_up")
+        return None  # 환율 없으면 원화환산액 없음
+
+    remaining_usd = amount_usd
+    fallback_rate = effective_overseas_rate or 0
+    fifo_krw = 0  # 원화 정수 합계 (반올림은 예치금별 사용분에서만 수행)
+
+    for dep in available_deposits:
+        if remaining_usd <= 0:
+            break
+
+        use = min(remaining_usd, dep.remaining_amount)
+        rate = dep.exchange_rate or fallback_rate
+        portion_krw = apply_rounding(use * rate, "round_half_up")
+        fifo_krw += portion_krw
+
+        # 잔액 차감 및 소진 처리
+        dep.remaining_amount -= use
+        if dep.remaining_amount <= 0:
+            dep.remaining_amount = 0
+            dep.is_exhausted = True
+
+        # 사용 기록 생성 (배치 ID 연결)
+        db.add(
+            DepositUsage(
+                deposit_id=dep.id,
+                usage_date=data.document_date,
+                amount=use,
+                amount_krw=portion_krw,
+                billing_cycle=data.billing_cycle,
+                slip_batch_id=batch_id,
+                uid=uid,
+                description=f"전표 생성 ({data.billing_cycle})",
+            )
+        )
+
+        remaining_usd -= use
+
+    # 예치금 부족분은 계약별 유효 환율로 원화 환산
+    if remaining_usd > 0:
+        fifo_krw += apply_rounding(remaining_usd * fallback_rate, "round_half_up")
+
+    return fifo_krw
+
+
+def _resolve_account_codes(
+    slip_type: str, config: SlipConfig, billing_profile, is_overseas: bool
+) -> tuple[str | None, str | None, str]:
+    """채권/채무과목, 계정과목, 부가세코드 결정 (청구프로필 > 해외법인수출 > 기본값)"""
+    ar_account = config.ar_account_default if slip_type == "sales" else config.ap_account_default
+
+    # 해외법인인 경우 수출 계정코드 사용
+    if is_overseas and slip_type == "sales":
+        hkont = config.hkont_sales_export or "41021020"
+    else:
+        hkont = config.hkont_sales if slip_type == "sales" else config.hkont_purchase
+
+    # 청구 프로필에 계정코드가 있으면 사용 (해외법인도 프로필 우선)
+    if billing_profile:
+        if slip_type == "sales":
+            if billing_profile.ar_account:
+                ar_account = billing_profile.ar_account
+            if billing_profile.hkont_sales:
+                hkont = billing_profile.hkont_sales
+        else:
+            if billing_profile.ap_account:
+                ar_account = billing_profile.ap_account
+            if billing_profile.hkont_purchase:
+                hkont = billing_profile.hkont_purchase
+
+    # 부가세코드 (결제 방식에 따라 결정)
+    tax_code = "A1"  # 기본값
+    if billing_profile and billing_profile.payment_type:
+        tax_code = tax_code_for(billing_profile.payment_type)
+
+    return ar_account, hkont, tax_code
+
+
+def _resolve_contract_codes(contract: HBContract | None) -> tuple[str, str]:
+    """매출/매입 계약번호 (없으면 기본값 사용)"""
+    sales_contract = (
+        contract.sales_contract_code if contract and contract.sales_contract_code else "매출ALI999"
+    )
+    purchase_contract = (
+        sales_contract.replace("매출", "매입") if "매출" in sales_contract else "매입ALI999"
+    )
+    return sales_contract, purchase_contract
+
+
+# 전표 유형별로 일부만 채우는 컬럼 (일괄 INSERT 시 행마다 키 구성을 맞추기 위한 기본값)
+_SLIP_ROW_OPTIONAL_FIELDS = dict.fromkeys(
+    (
+        "dmbtr_c",
+        "additional_charge_id",
+        "split_rule_id",
+        "split_allocation_id",
+        "pro_rata_ratio",
+        "original_amount",
+    )
+)
+
+
 @router.post("/generate")
 def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
     """
@@ -735,6 +996,8 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
     """
     billing_type = "enduser" if data.slip_type == "sales" else "reseller"
     batch_id = str(uuid.uuid4())[:8]
+    # 정산월 1일 (루프 안에서 반복 파싱하지 않도록 한 번만 계산)
+    billing_first_day = date(int(data.billing_cycle[:4]), int(data.billing_cycle[4:6]), 1)
 
     # 전표 설정 조회 (없으면 기본값으로 생성 및 저장)
     config = db.query(SlipConfig).filter(SlipConfig.vendor == "alibaba").first()
@@ -753,10 +1016,12 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
             rounding_rule=RoundingRule.FLOOR.value,
         )
         db.add(config)
-        db.commit()
+        # 배치 전체를 하나의 트랜잭션으로 커밋하도록 여기서는 flush만 수행
+        db.flush()
 
     # 벤더별 라운딩 규칙
     rounding_rule = config.rounding_rule or RoundingRule.FLOOR.value
+    pro_rata_enabled = config.pro_rata_enabled  # 벤더 설정 (계약별 오버라이드는 전표마다 적용)
 
     # 빌링 데이터 UID별 합산
     if billing_type == "reseller":
@@ -794,6 +1059,31 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
             detail=f"No billing data found for {data.billing_cycle} ({billing_type})",
         )
 
+    # UID → 계정/계약/회사 정보 일괄 조회 (UID별 개별 조회 대신 한 번의 IN 쿼리)
+    accounts_by_uid = {
+        account.id: account
+        for account in db.query(HBVendorAccount)
+        .options(
+            joinedload(HBVendorAccount.contract_mappings)
+            .joinedload(AccountContractMapping.contract)
+            .joinedload(HBContract.company)
+        )
+        .filter(HBVendorAccount.id.in_([b.uid for b in billing_summary]))
+        .all()
+    }
+
+    # 청구 프로필/외화 예치금 일괄 조회 (UID별 개별 조회 대신 계약·회사 seq IN 쿼리)
+    contract_profiles_by_seq, company_profiles_by_seq, deposits_by_profile = (
+        _load_billing_profiles(db, accounts_by_uid.values())
+    )
+
+    # 분할 청구 규칙 일괄 조회 (UID별 개별 조회 대신)
+    split_rules_by_uid = (
+        _get_split_rules_by_uid(db, [b.uid for b in billing_summary], data.billing_cycle)
+        if data.apply_split_billing
+        else {}
+    )
+
     # 환율 자동 조회 (국내용 기본 환율)
     exchange_rate_info = None
     exchange_rate_synced = False
@@ -823,12 +1113,37 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
     type_text = "매출" if data.slip_type == "sales" else "매입"
     sgtxt = config.sgtxt_template.replace("{MM}", month).replace("{TYPE}", type_text)
 
+    # 배치 내 모든 전표에 공통인 필드
+    slip_base = {
+        "batch_id": batch_id,
+        "slip_type": data.slip_type,
+        "vendor": "alibaba",
+        "billing_cycle": data.billing_cycle,
+        "bukrs": config.bukrs,
+        "bldat": data.document_date,
+        "budat": data.document_date,
+        "prctr": config.prctr,
+        "zzref2": config.zzref2,
+        "zzinvno": data.invoice_number,
+    }
+
+    slip_rows: list[dict] = []  # 일괄 INSERT 대상 (배치 요약 집계에도 사용)
+    account_codes_cache: dict[tuple, tuple[str | None, str | None, str]] = {}
+    contract_codes_cache: dict[int | None, tuple[str, str]] = {}
+    bp_codes_cache: dict[str, BPCode | None] = {}
+    contract_rate_cache: dict[date, float | None] = {}
     slips_created = []
     slips_no_mapping = []
     internal_cost_list = []  # 내부비용 별도 집계
     overseas_slips = []  # 해외법인 전표 별도 집계
     seqno = 1
 
+    def add_slip(**fields) -> None:
+        """배치 공통 필드와 순번을 채워 전표 행 추가 (INSERT는 마지막에 일괄 실행)"""
+        nonlocal seqno
+        slip_rows.append({**_SLIP_ROW_OPTIONAL_FIELDS, **slip_base, "seqno": seqno, **fields})
+        seqno += 1
+
     for billing in billing_summary:
         uid = billing.uid
         # 소수점 2자리 반올림 (ROUND_HALF_UP)
@@ -845,16 +1160,7 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
             amount_krw = apply_rounding(amount_usd, rounding_rule)
 
         # UID로 계약/회사 정보 조회
-        account = (
-            db.query(HBVendorAccount)
-            .options(
-                joinedload(HBVendorAccount.contract_mappings)
-                .joinedload(AccountContractMapping.contract)
-                .joinedload(HBContract.company)
-            )
-            .filter(HBVendorAccount.id == uid)
-            .first()
-        )
+        account = accounts_by_uid.get(uid)
 
         # 계약 정보 (첫 번째 활성 계약 사용)
         contract = None
@@ -909,18 +1215,8 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
             # 매입전표: 전표에는 안넣지만 집계만 함
             continue
 
-        # 해외법인 여부 및 통화 결정
+        # 해외법인 여부 (통화/원화환산 분기는 청구 프로필 조회 후 한 번만 수행)
         is_overseas = company.is_overseas if company else False
-        slip_currency = "KRW"  # 기본값
-        slip_amount = amount_krw  # 기본값: KRW 환산액
-        slip_amount_krw = amount_krw  # 원화환산액 (DMBTR_C)
-        applied_exchange_rate = domestic_exchange_rate  # 적용된 환율
-
-        if is_overseas and company:
-            # 해외법인: 통화금액(WRBTR)은 USD, 원화환산액(DMBTR_C)은 계약별 환율 결정 후 계산
-            slip_currency = "USD"  # 해외법인은 무조건 USD
-            slip_amount = apply_rounding(amount_usd, rounding_rule, decimals=2)  # USD 금액 (소수점 2자리)
-            slip_amount_krw = None  # 원화환산액은 청구 프로필 로딩 후 계산
 
         # 청구 프로필 조회 (우선순위: 계약별 > 회사별)
         contract_billing_profile = None
@@ -929,178 +1225,69 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
 
         # 1. 계약별 청구 프로필 조회
         if contract:
-            contract_billing_profile = (
-                db.query(ContractBillingProfile)
-                .filter(
-                    ContractBillingProfile.contract_seq == contract.seq,
-                    ContractBillingProfile.vendor == "alibaba",
-                )
-                .first()
-            )
+            contract_billing_profile = contract_profiles_by_seq.get(contract.seq)
             # 계약 프로필의 라운딩 오버라이드 적용
             if contract_billing_profile and contract_billing_profile.rounding_rule_override:
                 effective_rounding_rule = contract_billing_profile.rounding_rule_override
 
         # 2. 회사별 청구 프로필 조회 (계약별 프로필이 없는 경우)
         if not contract_billing_profile and company:
-            company_billing_profile = (
-                db.query(CompanyBillingProfile)
-                .filter(
-                    CompanyBillingProfile.company_seq == company.seq,
-                    CompanyBillingProfile.vendor == "alibaba",
-                )
-                .first()
-            )
+            company_billing_profile = company_profiles_by_seq.get(company.seq)
 
         # 유효한 청구 프로필 (계약별 우선)
         billing_profile = contract_billing_profile or company_billing_profile
 
-        # 해외법인 계약별 환율 결정
-        # 우선순위: 1) 계약별 프로필 환율 설정 → 2) 슬립 생성 시 지정 해외 환율 → 3) 글로벌 해외 환율
         if is_overseas:
-            effective_overseas_rate = None  # 아직 미결정
-
-            # 1. 계약별 청구 프로필 환율 설정 확인
-            if contract_billing_profile and (
-                contract_billing_profile.exchange_rate_type or contract_billing_profile.custom_exchange_rate_date
-            ):
-                rate_lookup_date = contract_billing_profile.custom_exchange_rate_date
-                if not rate_lookup_date and contract_billing_profile.exchange_rate_type:
-                    rule = contract_billing_profile.exchange_rate_type
-                    if rule == "document_date":
-                        rate_lookup_date = data.document_date
-                    elif rule == "first_of_document_month":
-                        rate_lookup_date = data.document_date.replace(day=1)
-                    elif rule == "first_of_billing_month":
-                        year = int(data.billing_cycle[:4])
-                        month = int(data.billing_cycle[4:6])
-                        rate_lookup_date = date(year, month, 1)
-                    elif rule == "last_of_prev_month":
-                        rate_lookup_date = data.document_date.replace(day=1) - timedelta(days=1)
-                    else:
-                        rate_lookup_date = data.document_date
-
-                if rate_lookup_date:
-                    contract_rate_record = (
-                        db.query(ExchangeRate)
-                        .filter(
-                            ExchangeRate.rate_date == rate_lookup_date,
-                            ExchangeRate.currency_from == "USD",
-                            ExchangeRate.currency_to == "KRW",
-                        )
-                        .first()
-                    )
-                    if contract_rate_record:
-                        rate_val = contract_rate_record.basic_rate or contract_rate_record.rate
-                        if rate_val:
-                            effective_overseas_rate = float(rate_val)
-
-            # 2. 계약별 환율 없으면 슬립 생성 시 지정한 해외 환율 사용
-            if effective_overseas_rate is None and data.overseas_exchange_rate_input:
-                effective_overseas_rate = data.overseas_exchange_rate_input
-
-            # 3. 그것도 없으면 글로벌 해외 환율 사용
-            if effective_overseas_rate is None:
-                effective_overseas_rate = overseas_exchange_rate
-
-            # 원화환산액 계산 (effective_overseas_rate 사용, 반올림 적용)
-            if effective_overseas_rate and effective_overseas_rate > 0:
-                # 해외 인보이스 원화환산은 반올림 적용 (소수점 없이)
-                slip_amount_krw = apply_rounding(
-                    amount_usd * effective_overseas_rate, "round_half_up"
-                )
-                applied_exchange_rate = effective_overseas_rate
-            else:
-                slip_amount_krw = None  # 환율 없으면 원화환산액 없음
+            # 해외법인: 통화금액(WRBTR)은 USD (소수점 2자리), 원화환산액(DMBTR_C)은 계약별 환율 적용
+            slip_currency = "USD"  # 해외법인은 무조건 USD
+            slip_amount = apply_rounding(amount_usd, rounding_rule, decimals=2)
+            effective_overseas_rate = _resolve_overseas_rate(
+                db,
+                data,
+                contract_billing_profile,
+                billing_first_day,
+                overseas_exchange_rate,
+                contract_rate_cache,
+            )
+            applied_exchange_rate = (
+                effective_overseas_rate
+                if effective_overseas_rate and effective_overseas_rate > 0
+                else domestic_exchange_rate
+            )
+            slip_amount_krw = _convert_overseas_amount(
+                db,
+                data,
+                batch_id,
+                uid,
+                amount_usd,
+                effective_overseas_rate,
+                deposits_by_profile.get(contract_billing_profile.id, [])
+                if contract_billing_profile
+                else [],
+            )
         else:
+            slip_currency = "KRW"
+            slip_amount = amount_krw  # KRW 환산액
+            slip_amount_krw = amount_krw
+            applied_exchange_rate = domestic_exchange_rate
             effective_overseas_rate = overseas_exchange_rate  # 국내는 해외 환율 불필요
 
-        # 해외 예치금 FIFO 환율 적용
-        # 계약별 청구 프로필이 있고, 해외법인(non-KRW)이고, USD 금액이 있는 경우
-        if is_overseas and contract_billing_profile and amount_usd > 0:
-            available_deposits = (
-                db.query(Deposit)
-                .filter(
-                    Deposit.contract_profile_id == contract_billing_profile.id,
-                    Deposit.is_exhausted == False,
-                    Deposit.currency != "KRW",
-                )
-                .order_by(Deposit.deposit_date)
-                .all()
-            )
-
-            if available_deposits:
-                remaining_usd = amount_usd
-                fifo_krw = 0.0
-
-                for dep in available_deposits:
-                    if remaining_usd <= 0:
-                        break
-
-                    use = min(remaining_usd, dep.remaining_amount)
-                    rate = dep.exchange_rate if dep.exchange_rate else (effective_overseas_rate or 0)
-                    # 해외 인보이스 원화환산은 반올림 적용
-                    portion_krw = float(apply_rounding(use * rate, "round_half_up"))
-                    fifo_krw += portion_krw
-
-                    # 잔액 차감 및 소진 처리
-                    dep.remaining_amount -= use
-                    if dep.remaining_amount <= 0:
-                        dep.remaining_amount = 0
-                        dep.is_exhausted = True
-
-                    # 사용 기록 생성 (배치 ID 연결)
-                    db.add(
-                        DepositUsage(
-                            deposit_id=dep.id,
-                            usage_date=data.document_date,
-                            amount=use,
-                            amount_krw=int(portion_krw),
-                            billing_cycle=data.billing_cycle,
-                            slip_batch_id=batch_id,
-                            uid=uid,
-                            description=f"전표 생성 ({data.billing_cycle})",
-                        )
-                    )
-
-                    remaining_usd -= use
-
-                # 예치금 부족분은 계약별 유효 환율로 원화 환산 (반올림 적용)
-                if remaining_usd > 0:
-                    fallback_rate = effective_overseas_rate or 0
-                    fifo_krw += float(
-                        apply_rounding(remaining_usd * fallback_rate, "round_half_up")
-                    )
-
-                slip_amount_krw = int(fifo_krw)
-
         # 계정코드 결정 (우선순위: 청구프로필 > BP코드 > 해외법인수출 > 기본값)
-        ar_account = (
-            config.ar_account_default if data.slip_type == "sales" else config.ap_account_default
-        )
-
-        # 해외법인인 경우 수출 계정코드 사용
-        if is_overseas and data.slip_type == "sales":
-            hkont = config.hkont_sales_export or "41021020"
-        else:
-            hkont = config.hkont_sales if data.slip_type == "sales" else config.hkont_purchase
-
-        # 1. 청구 프로필에 계정코드가 있으면 사용 (해외법인도 프로필 우선)
-        if billing_profile:
-            if data.slip_type == "sales":
-                if billing_profile.ar_account:
-                    ar_account = billing_profile.ar_account
-                if billing_profile.hkont_sales:
-                    hkont = billing_profile.hkont_sales
-            else:
-                if billing_profile.ap_account:
-                    ar_account = billing_profile.ap_account
-                if billing_profile.hkont_purchase:
-                    hkont = billing_profile.hkont_purchase
+        # 1. 청구 프로필/해외법인 기준 계정코드는 (프로필, 해외여부) 조합별로 한 번만 계산
+        account_key = (billing_profile, is_overseas)
+        if account_key not in account_codes_cache:
+            account_codes_cache[account_key] = _resolve_account_codes(
+                data.slip_type, config, billing_profile, is_overseas
+            )
+        ar_account, hkont, tax_code = account_codes_cache[account_key]
 
-        # 2. BP 코드에 계정코드가 있으면 사용 (청구프로필 없는 경우)
+        # 2. BP 코드에 계정코드가 있으면 사용 (청구프로필 없는 경우, BP별 한 번만 조회)
         if bp_number and not billing_profile:
-            bp = db.query(BPCode).filter(BPCode.bp_number == bp_number).first()
+            if bp_number not in bp_codes_cache:
+                bp_codes_cache[bp_number] = (
+                    db.query(BPCode).filter(BPCode.bp_number == bp_number).first()
+                )
+            bp = bp_codes_cache[bp_number]
             if bp:
                 if data.slip_type == "sales" and bp.ar_account:
                     ar_account = bp.ar_account
@@ -1116,31 +1303,35 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
             else:
                 amount_krw = apply_rounding(amount_usd, effective_rounding_rule)
 
-            if is_overseas and company:
+            if is_overseas:
                 slip_amount = apply_rounding(amount_usd, effective_rounding_rule)
             else:
                 slip_amount = amount_krw
 
-        # 계약번호 (없으면 기본값 사용)
-        sales_contract = (
-            contract.sales_contract_code
-            if contract and contract.sales_contract_code
-            else "매출ALI999"
-        )
-        purchase_contract = (
-            sales_contract.replace("매출", "매입") if "매출" in sales_contract else "매입ALI999"
-        )
-
-        # 부가세코드 (결제 방식에 따라 결정)
-        tax_code = "A1"  # 기본값
-        if billing_profile and billing_profile.payment_type:
-            tax_code = PAYMENT_TYPE_TAX_CODE.get(billing_profile.payment_type, "A1")
+        # 계약번호 (없으면 기본값 사용, 계약별 한 번만 계산)
+        contract_key = contract.seq if contract else None
+        if contract_key not in contract_codes_cache:
+            contract_codes_cache[contract_key] = _resolve_contract_codes(contract)
+        sales_contract, purchase_contract = contract_codes_cache[contract_key]
+
+        # 분할/일반 전표에 공통인 UID 단위 필드
+        uid_fields = {
+            "sgtxt": sgtxt,
+            "ar_account": ar_account,
+            "tax_code": tax_code,
+            "zzsconid": sales_contract,
+            "zzpconid": purchase_contract,
+            "zzsempnm": contract.sales_person if contract else None,
+            "uid": uid,
+            "contract_seq": contract.seq if contract else None,
+        }
 
         split_applied = False
         split_slips_info = []
 
-        if data.apply_split_billing:
-            split_result = _calculate_split_amounts(db, uid, amount_usd, data.billing_cycle)
+        split_rule = split_rules_by_uid.get(uid)
+        if split_rule:
+            split_result = _allocate_split_amounts(split_rule, amount_usd, data.billing_cycle)
             if split_result and split_result["allocations"]:
                 split_applied = True
                 # 분할 대상별 전표 생성
@@ -1164,7 +1355,11 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
 
                     if data.apply_pro_rata and contract:
                         pro_rata_ratio = _get_pro_rata_ratio(
-                            db, contract.seq, data.billing_cycle, config, contract_billing_profile
+                            db,
+                            contract.seq,
+                            data.billing_cycle,
+                            pro_rata_enabled,
+                            contract_billing_profile,
                         )
                         if pro_rata_ratio and pro_rata_ratio < 1.0:
                             original_usd = final_amount_usd
@@ -1194,46 +1389,26 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                         final_wrbtr = final_amount_krw
 
                     # 분할 전표 생성
-                    split_slip = SlipRecord(
-                        batch_id=batch_id,
-                        slip_type=data.slip_type,
-                        vendor="alibaba",
-                        billing_cycle=data.billing_cycle,
+                    add_slip(
+                        **uid_fields,
                         source_type=SlipSourceType.SPLIT.value,
-                        seqno=seqno,
-                        bukrs=config.bukrs,
-                        bldat=data.document_date,
-                        budat=data.document_date,
                         waers=final_slip_currency,
-                        sgtxt=sgtxt,
                         partner=target_bp,
                         partner_name=target_company.name if target_company else None,
-                        ar_account=ar_account,
                         hkont=config.hkont_sales_export if target_is_overseas else hkont,
-                        tax_code=tax_code,
                         wrbtr=final_wrbtr,
                         wrbtr_usd=final_amount_usd,
                         dmbtr_c=final_dmbtr_c,
                         exchange_rate=effective_overseas_rate
                         if target_is_overseas
                         else domestic_exchange_rate,
-                        prctr=config.prctr,
                         zzcon=target_bp,
-                        zzsconid=sales_contract,
-                        zzpconid=purchase_contract,
-                        zzsempnm=contract.sales_person if contract else None,
-                        zzref2=config.zzref2,
-                        zzinvno=data.invoice_number,
-                        uid=uid,
-                        contract_seq=contract.seq if contract else None,
                         company_seq=alloc["target_company_seq"],
                         split_rule_id=split_result["rule_id"],
                         split_allocation_id=alloc["allocation_id"],
                         pro_rata_ratio=pro_rata_applied,
                         original_amount=original_usd,
                     )
-                    db.add(split_slip)
-                    seqno += 1
 
                     split_slips_info.append(
                         {
@@ -1273,7 +1448,7 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
 
             if data.apply_pro_rata and contract:
                 pro_rata_ratio = _get_pro_rata_ratio(
-                    db, contract.seq, data.billing_cycle, config, contract_billing_profile
+                    db, contract.seq, data.billing_cycle, pro_rata_enabled, contract_billing_profile
                 )
                 if pro_rata_ratio and pro_rata_ratio < 1.0:
                     original_amount_usd = amount_usd
@@ -1299,44 +1474,23 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                         slip_amount = amount_krw
 
             # 전표 레코드 생성
-            slip = SlipRecord(
-                batch_id=batch_id,
-                slip_type=data.slip_type,
-                vendor="alibaba",
-                billing_cycle=data.billing_cycle,
+            add_slip(
+                **uid_fields,
                 source_type=SlipSourceType.BILLING.value,
-                seqno=seqno,
-                bukrs=config.bukrs,
-                bldat=data.document_date,
-                budat=data.document_date,
                 waers=slip_currency,
-                sgtxt=sgtxt,
                 partner=bp_number,
                 partner_name=company.name if company else None,
-                ar_account=ar_account,
                 hkont=hkont,
-                tax_code=tax_code,
                 wrbtr=slip_amount,
                 wrbtr_usd=amount_usd,
                 dmbtr_c=slip_amount_krw if is_overseas else None,
                 exchange_rate=applied_exchange_rate,
-                prctr=config.prctr,
                 zzcon=bp_number,
-                zzsconid=sales_contract,
-                zzpconid=purchase_contract,
-                zzsempnm=contract.sales_person if contract else None,
-                zzref2=config.zzref2,
-                zzinvno=data.invoice_number,
-                uid=uid,
-                contract_seq=contract.seq if contract else None,
                 company_seq=company.seq if company else None,
                 pro_rata_ratio=pro_rata_applied,
                 original_amount=original_amount_usd,
             )
 
-            db.add(slip)
-            seqno += 1
-
             if not bp_number:
                 slips_no_mapping.append(
                     {
@@ -1374,19 +1528,21 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
     additional_charge_slips = []
     if data.include_additional_charges:
         # 해당 정산월에 적용되는 추가 비용 조회 (모든 계약 대상)
+        # 매핑된 계약 전체를 한 번에 조회해 계약별 개별 조회를 생략
+        charges_by_contract = _get_applicable_additional_charges_bulk(
+            db,
+            {
+                mapping.contract_seq
+                for account in accounts_by_uid.values()
+                for mapping in account.contract_mappings
+            },
+            data.billing_cycle,
+            data.slip_type,
+        )
+
         processed_contracts = set()
-        for billing in billing_summary:
-            uid = billing.uid
-            account = (
-                db.query(HBVendorAccount)
-                .options(
-                    joinedload(HBVendorAccount.contract_mappings).joinedload(
-                        AccountContractMapping.contract
-                    )
-                )
-                .filter(HBVendorAccount.id == uid)
-                .first()
-            )
+        for billing in billing_summary if charges_by_contract else ():
+            account = accounts_by_uid.get(billing.uid)
 
             if not account or not account.contract_mappings:
                 continue
@@ -1399,10 +1555,8 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                     continue
                 processed_contracts.add(contract.seq)
 
-                # 해당 계약의 추가 비용 조회
-                charges = _get_applicable_additional_charges(
-                    db, contract.seq, data.billing_cycle, data.slip_type
-                )
+                # 해당 계약의 추가 비용
+                charges = charges_by_contract.get(contract.seq)
                 if not charges:
                     continue
 
@@ -1425,16 +1579,8 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                     # 추가 비용 전표 적요
                     charge_sgtxt = f"{sgtxt}_{charge.name}"
 
-                    charge_slip = SlipRecord(
-                        batch_id=batch_id,
-                        slip_type=data.slip_type,
-                        vendor="alibaba",
-                        billing_cycle=data.billing_cycle,
+                    add_slip(
                         source_type=SlipSourceType.ADDITIONAL_CHARGE.value,
-                        seqno=seqno,
-                        bukrs=config.bukrs,
-                        bldat=data.document_date,
-                        budat=data.document_date,
                         waers="KRW",
                         sgtxt=charge_sgtxt,
                         partner=bp_number,
@@ -1449,22 +1595,17 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                         wrbtr=charge_amount_krw,
                         wrbtr_usd=charge_amount_usd,
                         exchange_rate=domestic_exchange_rate,
-                        prctr=config.prctr,
                         zzcon=bp_number,
                         zzsconid=contract.sales_contract_code or "매출ALI999",
                         zzpconid=(contract.sales_contract_code or "매출ALI999").replace(
                             "매출", "매입"
                         ),
                         zzsempnm=contract.sales_person,
-                        zzref2=config.zzref2,
-                        zzinvno=data.invoice_number,
                         uid=None,
                         contract_seq=contract.seq,
                         company_seq=company.seq if company else None,
                         additional_charge_id=charge.id,
                     )
-                    db.add(charge_slip)
-                    seqno += 1
 
                     additional_charge_slips.append(
                         {
@@ -1476,6 +1617,19 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
                         }
                     )
 
+    if slip_rows:
+        # 모든 행의 키 구성이 같아 한 번의 executemany로 생성 순서대로 INSERT
+        db.execute(insert(SlipRecord), slip_rows)
+        db.add(
+            SlipBatch(
+                batch_id=batch_id,
+                billing_cycle=data.billing_cycle,
+                slip_type=data.slip_type,
+                count=len(slip_rows),
+                total_krw=sum(row["wrbtr"] or 0 for row in slip_rows),
+            )
+        )
+
     db.commit()
 
     # 내부비용 합계 계산
@@ -1546,6 +1700,23 @@ def generate_slips(data: SlipGenerateRequest, db: Session = Depends(get_db)):
     return result
 
 
+_SLIP_LIST_COLUMNS = (
+    SlipRecord.id,
+    SlipRecord.batch_id,
+    SlipRecord.seqno,
+    SlipRecord.slip_type,
+    SlipRecord.billing_cycle,
+    SlipRecord.partner,
+    SlipRecord.partner_name,
+    SlipRecord.wrbtr,
+    SlipRecord.wrbtr_usd,
+    SlipRecord.sgtxt,
+    SlipRecord.zzsconid,
+    SlipRecord.uid,
+    SlipRecord.is_confirmed,
+)
+
+
 @router.get("/")
 def get_slips(
     batch_id: str | None = Query(None),
@@ -1553,67 +1724,47 @@ def get_slips(
     slip_type: str | None = Query(None),
     has_bp: bool | None = Query(None),
     limit: int = Query(100, le=1000),
-    offset: int = Query(0),
-    db: Session = Depends(get_db),
+    cursor: int | None = Query(None, description="이전 페이지의 next_cursor (마지막 전표 ID)"),
+    include_total: bool = Query(False, description="전체 건수 포함 여부"),
+    db: Session = Depends(get_read_db),
 ):
-    """전표 목록 조회"""
-    query = db.query(SlipRecord)
+    """전표 목록 조회 (전표 ID 기준 keyset 페이지네이션)"""
+    # ORM 객체 대신 필요한 컬럼만 조회 (읽기 전용)
+    stmt = select(*_SLIP_LIST_COLUMNS)
 
     if batch_id:
-        query = query.filter(SlipRecord.batch_id == batch_id)
+        stmt = stmt.where(SlipRecord.batch_id == batch_id)
     if billing_cycle:
-        query = query.filter(SlipRecord.billing_cycle == billing_cycle)
+        stmt = stmt.where(SlipRecord.billing_cycle == billing_cycle)
     if slip_type:
-        query = query.filter(SlipRecord.slip_type == slip_type)
+        stmt = stmt.where(SlipRecord.slip_type == slip_type)
     if has_bp is True:
-        query = query.filter(SlipRecord.partner.isnot(None))
+        stmt = stmt.where(SlipRecord.partner.isnot(None))
     elif has_bp is False:
-        query = query.filter(SlipRecord.partner.is_(None))
+        stmt = stmt.where(SlipRecord.partner.is_(None))
+
+    # 전체 건수는 요청한 경우에만 계산 (필터 결과 전체를 세야 하므로)
+    total = None
+    if include_total:
+        total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar()
 
-    total = query.count()
-    slips = query.order_by(SlipRecord.seqno).offset(offset).limit(limit).all()
+    if cursor is not None:
+        stmt = stmt.where(SlipRecord.id > cursor)
+    stmt = stmt.order_by(SlipRecord.id).limit(limit).execution_options(yield_per=500)
+    slips = [dict(row) for row in db.execute(stmt).mappings()]
 
     return {
         "total": total,
         "limit": limit,
-        "offset": offset,
-        "data": [
-            {
-                "id": s.id,
-                "batch_id": s.batch_id,
-                "seqno": s.seqno,
-                "slip_type": s.slip_type,
-                "billing_cycle": s.billing_cycle,
-                "partner": s.partner,
-                "partner_name": s.partner_name,
-                "wrbtr": s.wrbtr,
-                "wrbtr_usd": s.wrbtr_usd,
-                "sgtxt": s.sgtxt,
-                "zzsconid": s.zzsconid,
-                "uid": s.uid,
-                "is_confirmed": s.is_confirmed,
-            }
-            for s in slips
-        ],
+        "next_cursor": slips[-1]["id"] if len(slips) == limit else None,
+        "data": slips,
     }
 
 
 @router.get("/batches")
-def get_slip_batches(db: Session = Depends(get_db)):
+def get_slip_batches(db: Session = Depends(get_read_db)):
     """전표 배치 목록"""
-    batches = (
-        db.query(
-            SlipRecord.batch_id,
-            SlipRecord.billing_cycle,
-            SlipRecord.slip_type,
-            func.count(SlipRecord.id).label("count"),
-            func.sum(SlipRecord.wrbtr).label("total_krw"),
-            func.min(SlipRecord.created_at).label("created_at"),
-        )
-        .group_by(SlipRecord.batch_id, SlipRecord.billing_cycle, SlipRecord.slip_type)
-        .order_by(func.min(SlipRecord.created_at).desc())
-        .all()
-    )
+    batches = db.query(SlipBatch).order_by(SlipBatch.created_at.desc()).all()
 
     return [
         {
@@ -1643,7 +1794,11 @@ class SlipUpdate(BaseModel):
 @router.patch("/{slip_id}")
 def update_slip(slip_id: int, data: SlipUpdate, db: Session = Depends(get_db)):
     """전표 수정"""
-    slip = db.query(SlipRecord).filter(SlipRecord.id == slip_id).first()
+    slip = db.execute(
+        select(
+            SlipRecord.id, SlipRecord.batch_id, SlipRecord.wrbtr, SlipRecord.is_confirmed
+        ).where(SlipRecord.id == slip_id)
+    ).first()
     if not slip:
         raise HTTPException(status_code=404, detail="Slip not found")
 
@@ -1664,8 +1819,18 @@ def update_slip(slip_id: int, data: SlipUpdate, db: Session = Depends(get_db)):
     if "zzsconid" in update_data:
         update_data["zzpconid"] = update_data["zzsconid"].replace("매출", "매입")
 
-    for key, value in update_data.items():
-        setattr(slip, key, value)
+    # 금액 변경 시 배치 요약 합계 보정
+    if "wrbtr" in update_data and update_data["wrbtr"] != slip.wrbtr:
+        db.execute(
+            update(SlipBatch)
+            .where(SlipBatch.batch_id == slip.batch_id)
+            .values(
+                total_krw=SlipBatch.total_krw + (update_data["wrbtr"] or 0) - (slip.wrbtr or 0)
+            )
+        )
+
+    if update_data:
+        db.execute(update(SlipRecord).where(SlipRecord.id == slip_id).values(**update_data))
 
     db.commit()
     return {"success": True, "id": slip_id}
@@ -1674,24 +1839,31 @@ def update_slip(slip_id: int, data: SlipUpdate, db: Session = Depends(get_db)):
 @router.post("/confirm/{batch_id}")
 def confirm_slips(batch_id: str, db: Session = Depends(get_db)):
     """배치 전표 확정"""
-    slips = db.query(SlipRecord).filter(SlipRecord.batch_id == batch_id).all()
+    in_batch = SlipRecord.batch_id == batch_id
+    # 전체 건수와 BP 없는 전표 건수를 한 번의 집계로 조회
+    count, no_bp = db.execute(
+        select(
+            func.count(),
+            func.count(
+                case((or_(SlipRecord.partner.is_(None), SlipRecord.partner == ""), 1))
+            ),
+        ).where(in_batch)
+    ).one()
 
-    if not slips:
+    if not count:
         raise HTTPException(status_code=404, detail="Batch not found")
 
     # BP 없는 전표 확인
-    no_bp = [s for s in slips if not s.partner]
     if no_bp:
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot confirm: {len(no_bp)} slips without BP mapping",
+            detail=f"Cannot confirm: {no_bp} slips without BP mapping",
         )
 
-    for slip in slips:
-        slip.is_confirmed = True
+    db.execute(update(SlipRecord).where(in_batch).values(is_confirmed=True))
 
     db.commit()
-    return {"success": True, "confirmed": len(slips)}
+    return {"success": True, "confirmed": count}
 
 
 def _format_amount(amount: float, currency: str) -> str | int:
@@ -1701,19 +1873,32 @@ def _format_amount(amount: float, currency: str) -> str | int:
     return f"{amount:.2f}"
 
 
-def _get_common_slip_fields(slip: SlipRecord, db: Session) -> dict:
+def _format_krw_amount(amount: float, currency: str) -> int:
+    return int(amount)
+
+
+def _format_foreign_amount(amount: float, currency: str) -> str:
+    return f"{amount:.2f}"
+
+
+def _get_amount_formatter(currencies: set[str | None]) -> Callable[[float, str], str | int]:
+    """배치 통화 구성에 맞는 금액 포맷터 (단일 통화 배치는 분기 없는 포맷터 사용)"""
+    if len(currencies) != 1:
+        return _format_amount
+    return _format_krw_amount if "KRW" in currencies else _format_foreign_amount
+
+
+def _get_common_slip_fields(
+    slip: Row, format_amount: Callable[[float, str], str | int] = _format_amount
+) -> dict:
     """전표 공통 필드 추출"""
-    tax_number = ""
-    if slip.partner:
-        bp = db.query(BPCode).filter(BPCode.bp_number == slip.partner).first()
-        if bp:
-            tax_number = bp.tax_number or ""
+    tax_number = slip.tax_number or ""
 
     dmbtr_c = ""
     if slip.waers != "KRW" and slip.dmbtr_c:
         dmbtr_c = int(slip.dmbtr_c)
 
-    wrbtr_display = _format_amount(slip.wrbtr, slip.waers)
+    wrbtr_display = format_amount(slip.wrbtr, slip.waers)
     bldat = slip.bldat.strftime("%Y%m%d") if slip.bldat else ""
     budat = slip.budat.strftime("%Y%m%d") if slip.budat else ""
 
@@ -1726,96 +1911,97 @@ def _get_common_slip_fields(slip: SlipRecord, db: Session) -> dict:
     }
 
 
-def _build_sales_row(slip: SlipRecord, f: dict) -> list:
+# 빈 텍스트 컬럼(None)은 _row_to_csv에서 ""로 출력되므로 행 생성 시 따로 치환하지 않음
+def _build_sales_row(slip: Row, f: dict) -> list:
     return [
         slip.seqno,
         slip.bukrs,
         f["bldat"],
         f["budat"],
         slip.waers,
-        slip.xblnr or "",
-        slip.sgtxt or "",
-        slip.partner or "",
-        slip.ar_account or "",
-        slip.hkont or "",
+        slip.xblnr,
+        slip.sgtxt,
+        slip.partner,
+        slip.ar_account,
+        slip.hkont,
         f["wrbtr_display"],
         f["dmbtr_c"],
-        slip.prctr or "",
-        slip.zzcon or "",
-        slip.zzsconid or "",
-        slip.zzpconid or "",
-        slip.zzsempno or "",
-        slip.zzsempnm or "",
-        slip.zzref2 or "",
-        slip.zzref or "",
-        slip.zzinvno or "",
-        slip.zzdepgno or "",
+        slip.prctr,
+        slip.zzcon,
+        slip.zzsconid,
+        slip.zzpconid,
+        slip.zzsempno,
+        slip.zzsempnm,
+        slip.zzref2,
+        slip.zzref,
+        slip.zzinvno,
+        slip.zzdepgno,
         "",
         f["tax_number"],
-        slip.partner_name or "",
+        slip.partner_name,
     ]
 
 
-def _build_cost_row(slip: SlipRecord, f: dict) -> list:
+def _build_cost_row(slip: Row, f: dict) -> list:
     return [
         slip.seqno,
         slip.bukrs,
         f["bldat"],
         f["budat"],
         slip.waers,
-        slip.xblnr or "",
-        slip.sgtxt or "",
-        slip.hkont or "",
-        slip.ar_account or "",
+        slip.xblnr,
+        slip.sgtxt,
+        slip.hkont,
+        slip.ar_account,
         f["wrbtr_display"],
         f["dmbtr_c"],
-        slip.prctr or "",
-        slip.zzcon or "",
-        slip.zzpconid or "",
-        slip.zzsconid or "",
-        slip.zzsempno or "",
-        slip.zzsempnm or "",
-        slip.zzref2 or "",
-        slip.zzinvno or "",
-        slip.partner or "",
-        slip.zzref or "",
+        slip.prctr,
+        slip.zzcon,
+        slip.zzpconid,
+        slip.zzsconid,
+        slip.zzsempno,
+        slip.zzsempnm,
+        slip.zzref2,
+        slip.zzinvno,
+        slip.partner,
+        slip.zzref,
         "",
         f["tax_number"],
-        slip.partner_name or "",
+        slip.partner_name,
     ]
 
 
-def _build_billing_row(slip: SlipRecord, f: dict) -> list:
+def _build_billing_row(slip: Row, f: dict) -> list:
     return [
         slip.seqno,
         slip.bukrs,
         f["bldat"],
         f["budat"],
         slip.waers,
-        slip.xblnr or "",
-        slip.sgtxt or "",
-        slip.partner or "",
-        slip.ar_account or "",
-        slip.hkont or "",
+        slip.xblnr,
+        slip.sgtxt,
+        slip.partner,
+        slip.ar_account,
+        slip.hkont,
         f["wrbtr_display"],
         f["dmbtr_c"],
         slip.tax_code or "A1",
         "",
         "",
-        slip.prctr or "",
-        slip.zzcon or "",
-        slip.zzsconid or "",
-        slip.zzsempno or "",
-        slip.zzsempnm or "",
-        slip.zzref2 or "",
-        slip.zzref or "",
-        slip.zzinvno or "",
+        slip.prctr,
+        slip.zzcon,
+        slip.zzsconid,
+        slip.zzsempno,
+        slip.zzsempnm,
+        slip.zzref2,
+        slip.zzref,
+        slip.zzinvno,
         "",
         "",
-        slip.zzdepgno or "",
+        slip.zzdepgno,
         "",
         f["tax_number"],
-        slip.partner_name or "",
+        slip.partner_name,
         f["wrbtr_display"],
     ]
 
@@ -1918,57 +2104,197 @@ _EXPORT_CONFIGS = {
 }
 
 
-def _export_slips(slips: list[SlipRecord], db: Session, slip_type: str) -> tuple[list, list]:
-    """통합 전표 내보내기"""
-    if slip_type in ("purchase", "cost"):
-        config = _EXPORT_CONFIGS["cost"]
-    elif slip_type == "billing":
-        config = _EXPORT_CONFIGS["billing"]
-    else:
-        config = _EXPORT_CONFIGS["sales"]
+def _encode_csv_header(headers: list[str]) -> bytes:
+    """BOM + 헤더 행을 미리 인코딩 (요청마다 재생성하지 않음)"""
+    output = io.StringIO()
+    csv.writer(output).writerow(headers)
+    # BOM 추가 (Excel 한글 호환)
+    return "\ufeff".encode("utf-8-sig") + output.getvalue().encode("utf-8")
+
+
+for _config in _EXPORT_CONFIGS.values():
+    _config["header_bytes"] = _encode_csv_header(_config["headers"])
+
+# 내보내기 양식에서 읽는 전표 컬럼 (ORM 객체 없이 Row로 조회)
+_EXPORT_COLUMNS = (
+    SlipRecord.seqno,
+    SlipRecord.bukrs,
+    SlipRecord.bldat,
+    SlipRecord.budat,
+    SlipRecord.waers,
+    SlipRecord.xblnr,
+    SlipRecord.sgtxt,
+    SlipRecord.partner,
+    SlipRecord.partner_name,
+    SlipRecord.ar_account,
+    SlipRecord.hkont,
+    SlipRecord.tax_code,
+    SlipRecord.wrbtr,
+    SlipRecord.dmbtr_c,
+    SlipRecord.prctr,
+    SlipRecord.zzcon,
+    SlipRecord.zzsconid,
+    SlipRecord.zzpconid,
+    SlipRecord.zzsempno,
+    SlipRecord.zzsempnm,
+    SlipRecord.zzref2,
+    SlipRecord.zzref,
+    SlipRecord.zzinvno,
+    SlipRecord.zzdepgno,
+)
+
+# 전표 유형 → 내보내기 양식 (그 외 유형은 매출 양식)
+_SLIP_TYPE_EXPORT_CONFIGS = {
+    "purchase": _EXPORT_CONFIGS["cost"],
+    "cost": _EXPORT_CONFIGS["cost"],
+    "billing": _EXPORT_CONFIGS["billing"],
+}
+
+
+def _row_to_csv(row: list) -> str:
+    """고정 양식 행을 CSV 한 줄로 변환 (따옴표 처리가 필요한 행만 csv.writer 사용)"""
+    fields = ["" if value is None else str(value) for value in row]
+    line = ",".join(fields)
+    if '"' in line or "\n" in line or "\r" in line or line.count(",") != len(fields) - 1:
+        output = io.StringIO()
+        csv.writer(output).writerow(row)
+        return output.getvalue()
+    return line + "\r\n"
+
+
+# 내보내기 응답 청크 크기 (행 수 미지정 시 약 64KB 단위로 전송)
+_EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _stream_export_csv(
+    batch_id: str,
+    config: dict,
+    format_amount: Callable[[float, str], str | int],
+    session_provider: Callable[[], Iterator[Session]],
+    rows_per_chunk: int | None = None,
+) -> Iterator[bytes]:
+    """전표 CSV를 청크 단위로 생성 (요청 세션과 별도 세션으로 스트리밍 조회)
+
+    session_provider는 get_read_db 같은 세션 의존성 제너레이터 (응답 전송이 끝날 때까지 유지)
+    """
+    yield config["header_bytes"]
 
     row_builder = config["row_builder"]
-    rows = []
-    for slip in slips:
-        fields = _get_common_slip_fields(slip, db)
-        rows.append(row_builder(slip, fields))
+    stmt = (
+        select(*_EXPORT_COLUMNS, BPCode.tax_number)
+        .outerjoin(SlipRecord.bp_code)
+        .where(SlipRecord.batch_id == batch_id)
+        .order_by(SlipRecord.seqno)
+        .execution_options(yield_per=1000)
+    )
+    chunk: list[bytes] = []
+    chunk_size = 0
+    sessions = session_provider()
+    db = next(sessions)
+    try:
+        for slip in db.execute(stmt):
+            line = _row_to_csv(row_builder(slip, _get_common_slip_fields(slip, format_amount)))
+            chunk.append(line.encode("utf-8"))
+            chunk_size += len(chunk[-1])
+            if (
+                len(chunk) >= rows_per_chunk
+                if rows_per_chunk
+                else chunk_size >= _EXPORT_CHUNK_BYTES
+            ):
+                yield b"".join(chunk)
+                chunk.clear()
+                chunk_size = 0
+    finally:
+        sessions.close()
+
+    if chunk:
+        yield b"".join(chunk)
+
+
+async def _prefetch_in_thread(chunks: Iterator[bytes], maxsize: int = 8) -> AsyncIterator[bytes]:
+    """동기 청크 생성기를 작업 스레드에서 미리 생산 (조회/직렬화와 소켓 전송을 겹쳐 실행)"""
+    buffer: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+    end = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
-    return config["headers"], rows
+    def produce() -> None:
+        item = end
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    break
+        except Exception as exc:
+            item = exc
+        finally:
+            chunks.close()
+        if not put(item):
+            # 소비측이 중단된 경우에도 대기 중인 get을 깨움
+            try:
+                buffer.put_nowait(end)
+            except queue.Full:
+                pass
+
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await loop.run_in_executor(None, buffer.get)
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
 
 
 @router.get("/export/{batch_id}")
-def export_slips_csv(batch_id: str, db: Session = Depends(get_db)):
+def export_slips_csv(
+    batch_id: str,
+    request: Request,
+    rows_per_chunk: int | None = Query(None, ge=1, description="청크당 행 수 (기본: 약 64KB)"),
+    db: Session = Depends(get_read_db),
+):
     """전표 CSV 내보내기 (전표 유형별 양식 적용)"""
-    slips = (
-        db.query(SlipRecord)
-        .filter(SlipRecord.batch_id == batch_id)
+    first = db.execute(
+        select(SlipRecord.slip_type, SlipRecord.billing_cycle)
+        .where(SlipRecord.batch_id == batch_id)
         .order_by(SlipRecord.seqno)
-        .all()
-    )
+        .limit(1)
+    ).first()
 
-    if not slips:
+    if not first:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    slip_type = slips[0].slip_type if slips else "sales"
-    headers, rows = _export_slips(slips, db, slip_type)
-
-    # CSV 생성
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(headers)
-    for row in rows:
-        writer.writerow(row)
-
-    # 파일 응답
-    output.seek(0)
-    billing_cycle = slips[0].billing_cycle if slips else ""
-    filename = f"{slip_type}_{billing_cycle}_{batch_id}.csv"
+    currencies = set(
+        db.scalars(select(SlipRecord.waers).where(SlipRecord.batch_id == batch_id).distinct())
+    )
 
-    # BOM 추가 (Excel 한글 호환)
-    content = "\ufeff" + output.getvalue()
+    slip_type = first.slip_type
+    config = _SLIP_TYPE_EXPORT_CONFIGS.get(slip_type, _EXPORT_CONFIGS["sales"])
+    filename = f"{slip_type}_{first.billing_cycle}_{batch_id}.csv"
+    # 스트리밍용 세션도 조회 전용 세션 사용 (복제본 설정/의존성 오버라이드를 그대로 따름)
+    session_provider = request.app.dependency_overrides.get(get_read_db, get_read_db)
 
     return StreamingResponse(
-        io.BytesIO(content.encode("utf-8-sig")),
+        _prefetch_in_thread(
+            _stream_export_csv(
+                batch_id,
+                config,
+                _get_amount_formatter(currencies),
+                session_provider,
+                rows_per_chunk,
+            )
+        ),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -1977,64 +2303,71 @@ def export_slips_csv(batch_id: str, db: Session = Depends(get_db)):
 @router.delete("/batch/{batch_id}")
 def delete_batch(batch_id: str, db: Session = Depends(get_db)):
     """배치 전표 삭제"""
-    slips = db.query(SlipRecord).filter(SlipRecord.batch_id == batch_id).all()
-
-    if not slips:
+    in_batch = SlipRecord.batch_id == batch_id
+    # 전체 건수와 확정 전표 건수를 한 번의 집계로 조회
+    count, confirmed = db.execute(
+        select(
+            func.count(), func.count(case((SlipRecord.is_confirmed == True, 1)))
+        ).where(in_batch)
+    ).one()
+
+    if not count:
         raise HTTPException(status_code=404, detail="Batch not found")
 
     # 확정된 전표가 있으면 삭제 불가
-    confirmed = [s for s in slips if s.is_confirmed]
     if confirmed:
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot delete: {len(confirmed)} slips are confirmed",
+            detail=f"Cannot delete: {confirmed} slips are confirmed",
         )
 
     # 예치금 사용 기록 복원 (이 배치로 차감된 예치금 되돌리기)
-    usages = db.query(DepositUsage).filter(DepositUsage.slip_batch_id == batch_id).all()
-    for usage in usages:
-        dep = db.query(Deposit).filter(Deposit.id == usage.deposit_id).first()
-        if dep:
-            dep.remaining_amount += usage.amount
-            dep.is_exhausted = False
-        db.delete(usage)
-
-    count = len(slips)
-    for slip in slips:
-        db.delete(slip)
+    in_usage_batch = DepositUsage.slip_batch_id == batch_id
+    used_amount = (
+        select(func.sum(DepositUsage.amount))
+        .where(in_usage_batch, DepositUsage.deposit_id == Deposit.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Deposit)
+        .where(Deposit.id.in_(select(DepositUsage.deposit_id).where(in_usage_batch)))
+        .values(remaining_amount=Deposit.remaining_amount + used_amount, is_exhausted=False)
+    )
+    db.execute(delete(DepositUsage).where(in_usage_batch))
+
+    db.execute(delete(SlipRecord).where(in_batch))
+
+    batch = db.get(SlipBatch, batch_id)
+    if batch:
+        db.delete(batch)
 
     db.commit()
     return {"success": True, "deleted": count}
 
 
-def _get_applicable_additional_charges(
+def _get_applicable_additional_charges_bulk(
     db: Session,
-    contract_seq: int,
+    contract_seqs: set[int],
     billing_cycle: str,
     slip_type: str,
-) -> list:
-    """특정 정산월/전표유형에 적용되는 추가 비용 조회"""
-    from app.api.additional_charge import get_applicable_charges
+) -> dict[int, list]:
+    """여러 계약의 정산월/전표유형별 적용 추가 비용 일괄 조회"""
+    from app.api.additional_charge import get_applicable_charges_bulk
 
-    return get_applicable_charges(db, contract_seq, billing_cycle, slip_type)
+    return get_applicable_charges_bulk(db, contract_seqs, billing_cycle, slip_type)
 
 
 def _get_pro_rata_ratio(
     db: Session,
     contract_seq: int,
     billing_cycle: str,
-    config: SlipConfig,
-    contract_profile,
+    pro_rata_enabled: bool,
+    contract_profile: ContractBillingProfile | None,
 ) -> float | None:
     """전표 생성 시 일할 비율 조회"""
     from app.api.pro_rata import get_pro_rata_ratio
 
-    pro_rata_enabled = config.pro_rata_enabled if hasattr(config, "pro_rata_enabled") else True
-    pro_rata_override = (
-        contract_profile.pro_rata_override
-        if contract_profile and hasattr(contract_profile, "pro_rata_override")
-        else None
-    )
+    pro_rata_override = contract_profile.pro_rata_override if contract_profile else None
 
     return get_pro_rata_ratio(db, contract_seq, billing_cycle, pro_rata_enabled, pro_rata_override)
 
@@ -2050,16 +2383,22 @@ def _get_split_rule(
     return get_split_rule_for_uid(db, uid, billing_cycle)
 
 
-def _calculate_split_amounts(
-    db: Session,
-    uid: str,
-    amount_usd: float,
-    billing_cycle: str,
-) -> dict | None:
+def _get_split_rules_by_uid(db: Session, uids: list[str], billing_cycle: str) -> dict:
+    """UID별 정산월에 적용되는 분할 청구 규칙 일괄 조회"""
+    from app.api.split_billing import get_split_rules_for_uids, select_split_rule
+
+    rules_by_uid = {
+        uid: select_split_rule(rules, billing_cycle)
+        for uid, rules in get_split_rules_for_uids(db, uids).items()
+    }
+    return {uid: rule for uid, rule in rules_by_uid.items() if rule is not None}
+
+
+def _allocate_split_amounts(rule, amount_usd: float, billing_cycle: str) -> dict | None:
     """분할 청구 금액 계산"""
-    from app.api.split_billing import calculate_split_amounts
+    from app.api.split_billing import allocate_split_amounts
 
-    return calculate_split_amounts(db, uid, amount_usd, billing_cycle)
+    return allocate_split_amounts(rule, amount_usd, billing_cycle)
 
 
 def _create_slip_record(
@@ -2092,39 +2431,10 @@ def _create_slip_record(
     dmbtr_c: float | None = None,
 ) -> SlipRecord:
     """전표 레코드 생성 헬퍼"""
-    # 계정코드 결정
-    ar_account = config.ar_account_default if slip_type == "sales" else config.ap_account_default
-
-    if is_overseas and slip_type == "sales":
-        hkont = config.hkont_sales_export or "41021020"
-    else:
-        hkont = config.hkont_sales if slip_type == "sales" else config.hkont_purchase
-
-    # 청구 프로필에 계정코드가 있으면 사용
-    if billing_profile:
-        if slip_type == "sales":
-            if billing_profile.ar_account:
-                ar_account = billing_profile.ar_account
-            if billing_profile.hkont_sales:
-                hkont = billing_profile.hkont_sales
-        else:
-            if billing_profile.ap_account:
-                ar_account = billing_profile.ap_account
-            if billing_profile.hkont_purchase:
-                hkont = billing_profile.hkont_purchase
-
-    # 계약번호
-    sales_contract = (
-        contract.sales_contract_code if contract and contract.sales_contract_code else "매출ALI999"
-    )
-    purchase_contract = (
-        sales_contract.replace("매출", "매입") if "매출" in sales_contract else "매입ALI999"
+    ar_account, hkont, tax_code = _resolve_account_codes(
+        slip_type, config, billing_profile, is_overseas
     )
-
-    # 부가세코드
-    tax_code = "A1"
-    if billing_profile and billing_profile.payment_type:
-        tax_code = PAYMENT_TYPE_TAX_CODE.get(billing_profile.payment_type, "A1")
+    sales_contract, purchase_contract = _resolve_contract_codes(contract)
 
     slip = SlipRecord(
         batch_id=batch_id,
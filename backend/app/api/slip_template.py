@@ -3,17 +3,25 @@
 - 기존 전표 xlsx 파일을 분석하여 템플릿화
 """
 
+import asyncio
+import hashlib
+import os
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from functools import lru_cache
 from io import BytesIO
 from typing import Any
 
 import numpy as np
 import pandas as pd
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.database import get_db
 from app.models.alibaba import BPCode
 from app.models.billing_profile import CompanyBillingProfile
@@ -23,6 +31,10 @@ from app.models.slip import SlipTemplate
 
 def convert_numpy_types(obj: Any) -> Any:
     """numpy 타입을 Python 기본 타입으로 변환"""
+    converter = _TYPE_CONVERTERS.get(type(obj))
+    if converter is not None:
+        return converter(obj)
+    # 표에 없는 하위 타입 (np.longlong 등)
     if isinstance(obj, np.integer):
         return int(obj)
     elif isinstance(obj, np.floating):
@@ -35,6 +47,21 @@ def convert_numpy_types(obj: Any) -> Any:
         return [convert_numpy_types(i) for i in obj]
     return obj
 
+
+# 자주 나오는 타입은 isinstance 체인 대신 type 조회 한 번으로 변환
+_TYPE_CONVERTERS: dict[type, Any] = {
+    **dict.fromkeys(
+        (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64), int
+    ),
+    **dict.fromkeys((np.float16, np.float32, np.float64), float),
+    np.ndarray: np.ndarray.tolist,
+    dict: lambda obj: {k: convert_numpy_types(v) for k, v in obj.items()},
+    list: lambda obj: [convert_numpy_types(i) for i in obj],
+    str: lambda obj: obj,
+    int: lambda obj: obj,
+    float: lambda obj: obj,
+}
+
 router = APIRouter(prefix="/api/slip/templates", tags=["slip-template"])
 
 
@@ -102,8 +129,7 @@ class TemplateResponse(BaseModel):
     source_file: str | None
     is_active: bool
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # === 프로필 추출 스키마 ===
@@ -147,53 +173,112 @@ class ProfileApplyRequest(BaseModel):
 # === Helper Functions ===
 
 
+_FIELD_NAME_RE = re.compile(r"^([A-Z_]+)")
+
+# 행마다 달라지는 필드 (값이 하나뿐이어도 고정값으로 보지 않음)
+_NON_FIXED_FIELDS = frozenset({"SEQNO", "BLDAT", "BUDAT", "WRBTR", "DMBTR_C"})
+
+# 전표적요 템플릿화 (월 숫자, 순번 표기)
+_DESC_MONTH_RE = re.compile(r"(\d{1,2})월")
+_DESC_SEQ_RE = re.compile(r"\(\d\)")
+
+# 한글 헤더 -> 필드명
+_KOREAN_FIELD_NAMES = {
+    "채권계정": "AR_ACCOUNT",
+    "사업자번호": "BIZ_NO",
+    "거래처명": "PARTNER_NAME",
+    "사명": "COMPANY_NAME",
+    "공급가": "SUPPLY_AMOUNT",
+    "부가세액": "VAT_AMOUNT",
+    "매출계약번호": "ZZSCONID_ALT",
+    "추가 수신인": "EXTRA_RECIPIENT",
+}
+
+
+@lru_cache(maxsize=1024)
 def extract_field_name(header: str) -> str:
     """헤더에서 필드명 추출 (예: 'BUKRS(회사코드)' -> 'BUKRS')"""
-    match = re.match(r"^([A-Z_]+)", header)
+    match = _FIELD_NAME_RE.match(header)
     if match:
         return match.group(1)
     # 한글 헤더
-    name_map = {
-        "채권계정": "AR_ACCOUNT",
-        "사업자번호": "BIZ_NO",
-        "거래처명": "PARTNER_NAME",
-        "사명": "COMPANY_NAME",
-        "공급가": "SUPPLY_AMOUNT",
-        "부가세액": "VAT_AMOUNT",
-        "매출계약번호": "ZZSCONID_ALT",
-        "추가 수신인": "EXTRA_RECIPIENT",
-    }
-    return name_map.get(header, header.replace(" ", "_").upper())
+    return _KOREAN_FIELD_NAMES.get(header, header.replace(" ", "_").upper())
 
 
-def detect_slip_type(columns: list[str]) -> str:
+def detect_slip_type(columns: Iterable[str]) -> str:
     """컬럼 구성으로 전표 유형 추정"""
-    col_set = set(columns)
+    # 결과는 컬럼 집합에만 의존하므로 frozenset 기준으로 캐시
+    return _detect_slip_type(frozenset(columns))
 
-    # 청구 전표: MWSKZ(부가세코드), ZTERM(수금조건) 있음
-    if any("MWSKZ" in c or "부가세코드" in c for c in columns):
-        return "billing"
 
+# 전표 유형별 헤더 키워드 (우선순위 순)
+_SLIP_TYPE_KEYWORDS = (
+    # 청구 전표: MWSKZ(부가세코드), ZTERM(수금조건) 있음
+    ("billing", ("MWSKZ", "부가세코드")),
     # 원가 전표: KOSTL(코스트센터), BKTXT(전표적요) 있음
-    if any("KOSTL" in c or "코스트센터" in c for c in columns):
-        return "purchase"
-
-    if any("BKTXT" in c for c in columns):
-        return "purchase"
-
+    ("purchase", ("KOSTL", "코스트센터", "BKTXT")),
     # 매출 전표: 채권계정, SGTXT(전표적요) 있음
-    if any("채권계정" in c for c in columns):
-        return "sales"
-
-    return "sales"  # 기본값
-
-
-def detect_data_type(series: pd.Series) -> str:
-    """데이터 타입 추정"""
-    non_null = series.dropna()
+    ("sales", ("채권계정",)),
+)
+_SLIP_TYPE_RE = re.compile(
+    "|".join(
+        f"(?P<{slip_type}>{'|'.join(map(re.escape, keywords))})"
+        for slip_type, keywords in _SLIP_TYPE_KEYWORDS
+    )
+)
+
+
+@lru_cache(maxsize=256)
+def _detect_slip_type(columns: frozenset[str]) -> str:
+    # 헤더 전체를 한 번 스캔한 뒤 우선순위가 가장 높은 유형 선택
+    found = {m.lastgroup for m in _SLIP_TYPE_RE.finditer("\n".join(columns))}
+    return next((t for t, _ in _SLIP_TYPE_KEYWORDS if t in found), "sales")  # 기본값: 매출
+
+
+# 컬럼 탐색에 쓰는 헤더 토큰
+_HEADER_TOKENS = (
+    "PARTNER", "WAERS", "HKONT", "MWSKZ",
+    "사업자번호", "거래처명", "사명", "채권계정", "부가세코드", "매출", "원가", "상대",
+)
+# 전체 토큰을 하나의 패턴으로 - 헤더당 한 번 스캔 (lookahead로 겹치는 토큰도 모두 찾음)
+_HEADER_TOKEN_RE = re.compile(f"(?=({'|'.join(map(re.escape, _HEADER_TOKENS))}))")
+
+
+@lru_cache(maxsize=64)
+def _header_token_index(columns: tuple) -> dict[str, frozenset[int]]:
+    """헤더 토큰 -> 토큰을 포함한 컬럼 위치 (같은 컬럼 구성은 한 번만 스캔)"""
+    index: dict[str, set[int]] = {}
+    for pos, col in enumerate(columns):
+        for match in _HEADER_TOKEN_RE.finditer(str(col)):
+            index.setdefault(match.group(1), set()).add(pos)
+    return {token: frozenset(positions) for token, positions in index.items()}
+
+
+def _find_column(columns: tuple, *token_groups: str | tuple[str, ...]) -> Any | None:
+    """모든 토큰 그룹을 포함하는 첫 번째 컬럼 (튜플 그룹은 그 중 하나만 포함해도 됨)"""
+    index = _header_token_index(columns)
+    matched: frozenset[int] | None = None
+    for group in token_groups:
+        tokens = (group,) if isinstance(group, str) else group
+        positions = frozenset().union(*(index.get(token, ()) for token in tokens))
+        matched = positions if matched is None else matched & positions
+    return columns[min(matched)] if matched else None
+
+
+def detect_data_type(series: pd.Series, non_null: pd.Series | None = None) -> str:
+    """데이터 타입 추정 (non_null: 이미 계산된 series.dropna() 재사용)"""
+    if non_null is None:
+        non_null = series.dropna()
     if len(non_null) == 0:
         return "string"
 
+    # dtype이 정해진 컬럼은 값 확인 없이 판단 (numpy 스칼라는 int가 아니므로 8자리 날짜 규칙 미적용)
+    kind = series.dtype.kind
+    if kind == "M":
+        return "date"
+    if kind in "biuf":
+        return "number"
+
     sample = non_null.iloc[0]
 
     # 날짜 체크 (8자리 숫자 or datetime)
@@ -210,6 +295,30 @@ def detect_data_type(series: pd.Series) -> str:
     return "string"
 
 
+def _account_code_str(acc: Any) -> str:
+    """숫자로 읽힌 계정코드를 문자열로 (예: 11060010.0 -> '11060010')"""
+    return str(int(acc))
+
+
+def _currencies_by_account(df: pd.DataFrame, acc_data: pd.Series, waers_col: str) -> pd.Series:
+    """계정값별 통화 목록 (계정값 첫 등장 순, 빈 계정값 제외)"""
+    return df[waers_col].groupby(acc_data, sort=False).unique()
+
+
+def _map_accounts_by_currency(
+    currencies_by_account: pd.Series,
+    account_mappings: dict[str, dict[str, str]],
+    key: str,
+    to_str: Callable[[Any], str],
+) -> None:
+    """계정값별 통화 구성으로 국내(KRW)/해외(USD) 계정 매핑 (뒤에 나온 계정이 덮어씀)"""
+    for acc, currencies in currencies_by_account.items():
+        if "KRW" in currencies:
+            account_mappings["domestic"][key] = to_str(acc)
+        elif "USD" in currencies:
+            account_mappings["overseas"][key] = to_str(acc)
+
+
 def analyze_template(df: pd.DataFrame, filename: str) -> TemplateAnalysis:
     """엑셀 데이터에서 템플릿 분석"""
     columns = []
@@ -218,24 +327,46 @@ def analyze_template(df: pd.DataFrame, filename: str) -> TemplateAnalysis:
 
     slip_type = detect_slip_type(list(df.columns))
 
+    # 숫자/날짜만 담긴 object 컬럼을 실제 dtype으로 (이후 고유값/그룹 연산이 벡터 경로를 탐)
+    df = df.infer_objects()
+
+    # 샘플값/고유값은 앞부분 행만으로 판단 (고정값은 아래에서 전체 행으로 재확인)
+    sample_df = df.head(settings.template_sample_rows)
+    is_sampled = len(sample_df) < len(df)
+    # 컬럼별 고유값 수는 한 번에 계산 (위치 기준, 중복 헤더 대비)
+    unique_counts = sample_df.nunique().to_numpy()
+    fixed_candidates: list[tuple[int, str, Any]] = []  # (위치, 필드명, 값)
+
     for idx, header in enumerate(df.columns):
         if pd.isna(header) or str(header).startswith("Unnamed"):
             continue
 
         field_name = extract_field_name(str(header))
-        data_type = detect_data_type(df.iloc[:, idx])
+        series = df.iloc[:, idx]
+        non_null = sample_df.iloc[:, idx].dropna()  # 컬럼당 한 번만 계산해 아래에서 재사용
+        n_unique = unique_counts[idx]
+        if non_null.empty and is_sampled:
+            # 앞부분이 모두 빈 값이면 전체 행 기준
+            non_null = series.dropna()
+            n_unique = non_null.nunique()
+        data_type = detect_data_type(series, non_null)
 
         # 샘플 값 추출 (최대 5개 고유값)
-        unique_vals = df.iloc[:, idx].dropna().unique()[:5]
-        sample_values = []
-        for v in unique_vals:
-            if isinstance(v, pd.Timestamp):
-                sample_values.append(v.isoformat())
-            else:
-                sample_values.append(convert_numpy_types(v))
+        unique_vals = non_null.unique()[:5]
+        if isinstance(unique_vals, np.ndarray) and unique_vals.dtype.kind in "iuf":
+            # 숫자 배열은 tolist() 한 번으로 Python 기본 타입 변환
+            sample_values = unique_vals.tolist()
+        else:
+            sample_values = []
+            for v in unique_vals:
+                if isinstance(v, pd.Timestamp):
+                    sample_values.append(v.isoformat())
+                else:
+                    sample_values.append(convert_numpy_types(v))
 
+        # 값은 위에서 이미 Python 기본 타입으로 만들었으므로 검증 없이 생성
         columns.append(
-            ColumnDef(
+            ColumnDef.model_construct(
                 index=idx,
                 name=field_name,
                 header=str(header),
@@ -244,78 +375,66 @@ def analyze_template(df: pd.DataFrame, filename: str) -> TemplateAnalysis:
             )
         )
 
-        # 고정값 추출 (모든 행이 동일한 값)
-        unique_count = df.iloc[:, idx].nunique()
-        if unique_count == 1 and field_name not in [
-            "SEQNO",
-            "BLDAT",
-            "BUDAT",
-            "WRBTR",
-            "DMBTR_C",
-        ]:
-            val = df.iloc[:, idx].dropna().iloc[0] if len(df.iloc[:, idx].dropna()) > 0 else None
-            if val is not None and not pd.isna(val):
-                # Timestamp를 문자열로 변환
-                if isinstance(val, pd.Timestamp):
-                    val = val.strftime("%Y%m%d")
-                else:
-                    val = convert_numpy_types(val)
-                fixed_values[field_name] = val
+        # 고정값 후보 (모든 행이 동일한 값)
+        if n_unique == 1 and field_name not in _NON_FIXED_FIELDS:
+            fixed_candidates.append((idx, field_name, non_null.iloc[0]))
+
+    # 샘플링한 경우 후보 컬럼 전체 행이 같은 값(또는 빈 값)인지 한 번의 마스크 연산으로 확인
+    if is_sampled and fixed_candidates:
+        candidate_df = df.iloc[:, [idx for idx, _, _ in fixed_candidates]]
+        candidate_vals = [val for _, _, val in fixed_candidates]
+        is_fixed = (candidate_df.isna() | candidate_df.eq(candidate_vals)).all().to_numpy()
+        fixed_candidates = [c for c, ok in zip(fixed_candidates, is_fixed) if ok]
+
+    for _, field_name, val in fixed_candidates:
+        # Timestamp를 문자열로 변환
+        if isinstance(val, pd.Timestamp):
+            val = val.strftime("%Y%m%d")
+        else:
+            val = convert_numpy_types(val)
+        fixed_values[field_name] = val
 
     # 계정 매핑 분석
-    for col_def in columns:
-        col_data = df[col_def.header]
+    # 같은 계정 컬럼을 아래 세 블록에서 다시 보므로 고유값 수/통화 분포는 컬럼당 한 번만 계산
+    waers_col = _find_column(tuple(df.columns), "WAERS")
+    unique_count_cache: dict[str, int] = {}
+    currency_cache: dict[str, pd.Series] = {}
+
+    def account_unique_count(header: str) -> int:
+        """빈 값을 포함한 고유값 수"""
+        if header not in unique_count_cache:
+            unique_count_cache[header] = len(df[header].unique())
+        return unique_count_cache[header]
+
+    def map_accounts(header: str, key: str, to_str: Callable[[Any], str]) -> None:
+        if header not in currency_cache:
+            currency_cache[header] = _currencies_by_account(df, df[header], waers_col)
+        _map_accounts_by_currency(currency_cache[header], account_mappings, key, to_str)
 
+    for col_def in columns:
         # 통화별 계정 분석
         if col_def.name in ["HKONT", "AR_ACCOUNT", "채권계정"]:
-            unique_accounts = col_data.unique()
-            if len(unique_accounts) == 2:
+            if account_unique_count(col_def.header) == 2:
                 # KRW/USD 행 구분해서 매핑
-                waers_col = next((c for c in df.columns if "WAERS" in str(c)), None)
                 if waers_col:
-                    for acc in unique_accounts:
-                        acc_rows = df[col_data == acc]
-                        currencies = acc_rows[waers_col].unique()
-                        if "KRW" in currencies:
-                            if "매출" in col_def.header or col_def.name == "HKONT":
-                                account_mappings["domestic"]["revenue"] = str(acc)
-                            else:
-                                account_mappings["domestic"]["receivable"] = str(acc)
-                        elif "USD" in currencies:
-                            if "매출" in col_def.header or col_def.name == "HKONT":
-                                account_mappings["overseas"]["revenue"] = str(acc)
-                            else:
-                                account_mappings["overseas"]["receivable"] = str(acc)
+                    key = (
+                        "revenue"
+                        if "매출" in col_def.header or col_def.name == "HKONT"
+                        else "receivable"
+                    )
+                    map_accounts(col_def.header, key, str)
 
     # 채권계정 분석 (매출전표)
     ar_col = next((c for c in columns if c.name == "AR_ACCOUNT" or "채권계정" in c.header), None)
     if ar_col:
-        ar_data = df[ar_col.header]
-        unique_ar = ar_data.unique()
-        waers_col = next((c for c in df.columns if "WAERS" in str(c)), None)
-        if waers_col and len(unique_ar) >= 2:
-            for acc in unique_ar:
-                acc_rows = df[ar_data == acc]
-                currencies = acc_rows[waers_col].unique()
-                if "KRW" in currencies:
-                    account_mappings["domestic"]["receivable"] = str(int(acc)) if pd.notna(acc) else None
-                elif "USD" in currencies:
-                    account_mappings["overseas"]["receivable"] = str(int(acc)) if pd.notna(acc) else None
+        if waers_col and account_unique_count(ar_col.header) >= 2:
+            map_accounts(ar_col.header, "receivable", _account_code_str)
 
     # 매출계정 분석
     hkont_col = next((c for c in columns if "HKONT" in c.name and "매출" in c.header), None)
     if hkont_col:
-        hkont_data = df[hkont_col.header]
-        unique_hkont = hkont_data.unique()
-        waers_col = next((c for c in df.columns if "WAERS" in str(c)), None)
-        if waers_col and len(unique_hkont) >= 2:
-            for acc in unique_hkont:
-                acc_rows = df[hkont_data == acc]
-                currencies = acc_rows[waers_col].unique()
-                if "KRW" in currencies:
-                    account_mappings["domestic"]["revenue"] = str(int(acc)) if pd.notna(acc) else None
-                elif "USD" in currencies:
-                    account_mappings["overseas"]["revenue"] = str(int(acc)) if pd.notna(acc) else None
+        if waers_col and account_unique_count(hkont_col.header) >= 2:
+            map_accounts(hkont_col.header, "revenue", _account_code_str)
 
     # 계약번호 패턴
     contract_pattern = {}
@@ -333,20 +452,81 @@ def analyze_template(df: pd.DataFrame, filename: str) -> TemplateAnalysis:
     if desc_col and len(desc_col.sample_values) > 0:
         sample_desc = str(desc_col.sample_values[0])
         # 월 숫자를 {month}로 치환
-        desc_template = re.sub(r"(\d{1,2})월", "{month}월", sample_desc)
-        desc_template = re.sub(r"\(\d\)", "", desc_template)  # (1) 같은 것 제거
+        desc_template = _DESC_MONTH_RE.sub("{month}월", sample_desc)
+        desc_template = _DESC_SEQ_RE.sub("", desc_template)  # (1) 같은 것 제거
 
     return TemplateAnalysis(
         slip_type=slip_type,
         columns=columns,
-        fixed_values=convert_numpy_types(fixed_values),
-        account_mappings=convert_numpy_types(account_mappings),
+        fixed_values=fixed_values,  # 값은 추출 시점에 이미 변환됨
+        account_mappings=account_mappings,  # 값은 모두 str/None
         contract_pattern=contract_pattern if contract_pattern else None,
         description_template=desc_template,
         row_count=len(df),
     )
 
 
+def _read_slip_excel(source, nrows: int | None = None) -> pd.DataFrame:
+    """전표 xlsx 읽기 (설정된 엔진 사용, nrows 지정 시 앞부분만)"""
+    return pd.read_excel(source, header=0, engine=settings.excel_engine, nrows=nrows)
+
+
+def _read_template_excel(source) -> pd.DataFrame:
+    """템플릿 분석용 전표 xlsx 읽기 (template_analyze_rows 만큼만)"""
+    return _read_slip_excel(source, nrows=settings.template_analyze_rows)
+
+
+# 파싱/분석 결과 캐시 (파일 내용과 파싱 설정이 같으면 재파싱 생략, 최근 사용 순 최대 N개)
+_PARSE_CACHE_SIZE = 32
+_parse_cache: OrderedDict[tuple, Any] = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+
+def _content_key(content: bytes) -> tuple:
+    """업로드 파일 캐시 키 (내용 해시)"""
+    return ("content", hashlib.blake2b(content, digest_size=16).digest())
+
+
+def _path_key(path) -> tuple:
+    """경로 파일 캐시 키 (파일이 바뀌면 mtime/size가 달라져 자동 무효화)"""
+    stat = path.stat()
+    return ("path", str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def _cached_parse(key: tuple, compute: Callable[[], Any]) -> Any:
+    """key 기준 결과 캐시 (반환값은 공유되므로 읽기 전용으로 사용)"""
+    key = (
+        *key,
+        settings.excel_engine,
+        settings.template_analyze_rows,
+        settings.template_sample_rows,
+    )
+    with _parse_cache_lock:
+        if key in _parse_cache:
+            _parse_cache.move_to_end(key)
+            return _parse_cache[key]
+
+    result = compute()
+    with _parse_cache_lock:
+        _parse_cache[key] = result
+        while len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return result
+
+
+def _parse_and_analyze(source, filename: str, cache_key: tuple) -> TemplateAnalysis:
+    """xlsx 파싱 + 템플릿 분석 (워커 스레드에서 한 번에 실행)"""
+    return _cached_parse(
+        ("analysis", filename, *cache_key),
+        lambda: analyze_template(_read_template_excel(source), filename),
+    )
+
+
+def _parse_slip(source, cache_key: tuple) -> pd.DataFrame:
+    """프로필 추출용 전표 xlsx 읽기 (워커 스레드에서 실행)"""
+    return _cached_parse(("frame", *cache_key), lambda: _read_slip_excel(source))
+
+
 # === API Endpoints ===
 
 
@@ -359,10 +539,10 @@ async def analyze_slip_template(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="xlsx 또는 xls 파일만 지원합니다.")
 
     content = await file.read()
-    df = pd.read_excel(BytesIO(content), header=0)
-
-    analysis = analyze_template(df, file.filename)
-    return analysis
+    # 파싱/분석은 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+    return await asyncio.to_thread(
+        _parse_and_analyze, BytesIO(content), file.filename, _content_key(content)
+    )
 
 
 @router.post("/", response_model=TemplateResponse)
@@ -397,9 +577,9 @@ async def import_template(
         raise HTTPException(status_code=400, detail="xlsx 또는 xls 파일만 지원합니다.")
 
     content = await file.read()
-    df = pd.read_excel(BytesIO(content), header=0)
-
-    analysis = analyze_template(df, file.filename)
+    analysis = await asyncio.to_thread(
+        _parse_and_analyze, BytesIO(content), file.filename, _content_key(content)
+    )
 
     template_name = name or file.filename.replace(".xlsx", "").replace(".xls", "")
 
@@ -428,8 +608,24 @@ async def import_template(
     return db_template
 
 
+_template_adapter = TypeAdapter(TemplateResponse)
+_template_list_adapter = TypeAdapter(list[TemplateResponse])
+
+
+def _etag_json_response(request: Request, body: bytes) -> Response:
+    """직렬화한 본문 해시를 ETag로 응답 (If-None-Match가 같으면 본문 없이 304)"""
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    client_etags = {
+        tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")
+    }
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
 @router.get("/", response_model=list[TemplateResponse])
 async def list_templates(
+    request: Request,
     slip_type: str | None = None,
     active_only: bool = True,
     db: Session = Depends(get_db),
@@ -442,7 +638,11 @@ async def list_templates(
         query = query.where(SlipTemplate.is_active == True)
 
     templates = db.execute(query.order_by(SlipTemplate.id.desc())).scalars().all()
-    return templates
+    # 한 번만 직렬화해 ETag 계산에 재사용 (response_model 재검증 생략)
+    body = _template_list_adapter.dump_json(
+        _template_list_adapter.validate_python(templates, from_attributes=True)
+    )
+    return _etag_json_response(request, body)
 
 
 # === 파일 경로 기반 API (동적 라우트보다 먼저 정의) ===
@@ -468,23 +668,28 @@ async def scan_template_files():
         return []
 
     files = []
-    for f in base_dir.glob("*.xlsx"):
-        # 파일명에서 전표 유형 추정
-        fname_lower = f.name.lower()
-        slip_type_guess = None
-        if "매출" in f.name or "sales" in fname_lower:
-            slip_type_guess = "sales"
-        elif "청구" in f.name or "billing" in fname_lower:
-            slip_type_guess = "billing"
-        elif "원가" in f.name or "purchase" in fname_lower or "cost" in fname_lower:
-            slip_type_guess = "purchase"
-
-        files.append(FileInfo(
-            filename=f.name,
-            path=str(f),
-            size=f.stat().st_size,
-            slip_type_guess=slip_type_guess,
-        ))
+    # scandir 항목은 이름/경로를 이미 갖고 있어 Path 생성 없이 stat 한 번으로 처리
+    with os.scandir(base_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".xlsx"):
+                continue
+
+            # 파일명에서 전표 유형 추정
+            fname_lower = entry.name.lower()
+            slip_type_guess = None
+            if "매출" in entry.name or "sales" in fname_lower:
+                slip_type_guess = "sales"
+            elif "청구" in entry.name or "billing" in fname_lower:
+                slip_type_guess = "billing"
+            elif "원가" in entry.name or "purchase" in fname_lower or "cost" in fname_lower:
+                slip_type_guess = "purchase"
+
+            files.append(FileInfo(
+                filename=entry.name,
+                path=entry.path,
+                size=entry.stat().st_size,
+                slip_type_guess=slip_type_guess,
+            ))
 
     # 파일명 순 정렬
     files.sort(key=lambda x: x.filename)
@@ -503,9 +708,7 @@ async def analyze_template_from_path(file_path: str):
     if not path.suffix.lower() in [".xlsx", ".xls"]:
         raise HTTPException(status_code=400, detail="xlsx 또는 xls 파일만 지원합니다.")
 
-    df = pd.read_excel(path, header=0)
-    analysis = analyze_template(df, path.name)
-    return analysis
+    return await asyncio.to_thread(_parse_and_analyze, path, path.name, _path_key(path))
 
 
 @router.post("/import-path", response_model=TemplateResponse)
@@ -524,8 +727,7 @@ async def import_template_from_path(
     if not path.suffix.lower() in [".xlsx", ".xls"]:
         raise HTTPException(status_code=400, detail="xlsx 또는 xls 파일만 지원합니다.")
 
-    df = pd.read_excel(path, header=0)
-    analysis = analyze_template(df, path.name)
+    analysis = await asyncio.to_thread(_parse_and_analyze, path, path.name, _path_key(path))
 
     template_name = name or path.stem  # 확장자 제외한 파일명
 
@@ -557,97 +759,107 @@ async def import_template_from_path(
 # === 프로필 추출 API ===
 
 
+def _group_mode(df: pd.DataFrame, key_col: str, value_col: str) -> pd.Series:
+    """그룹별 최빈값 (빈 값 제외, 동률이면 작은 값 - Series.mode().iloc[0]과 동일)"""
+    counts = df.groupby([key_col, value_col]).size()
+    # (그룹, 값) 정렬 상태에서 빈도 내림차순 안정 정렬 -> 그룹별 첫 행이 최빈값 중 가장 작은 값
+    top = counts.sort_values(ascending=False, kind="stable")
+    keys = top.index.get_level_values(0)
+    first = ~keys.duplicated()
+    return pd.Series(top.index.get_level_values(1)[first], index=keys[first])
+
+
 def extract_profiles_from_df(df: pd.DataFrame, slip_type: str, db: Session) -> list[ExtractedProfile]:
     """DataFrame에서 BP별 프로필 정보 추출"""
     profiles = []
+    df = df.infer_objects()
 
     # 컬럼명 찾기
-    partner_col = next((c for c in df.columns if "PARTNER" in str(c)), None)
-    waers_col = next((c for c in df.columns if "WAERS" in str(c)), None)
-    tax_no_col = next((c for c in df.columns if "사업자번호" in str(c)), None)
-    name_col = next((c for c in df.columns if "거래처명" in str(c) or "사명" in str(c)), None)
+    cols = tuple(df.columns)
+    partner_col = _find_column(cols, "PARTNER")
+    waers_col = _find_column(cols, "WAERS")
+    tax_no_col = _find_column(cols, "사업자번호")
+    name_col = _find_column(cols, ("거래처명", "사명"))
 
     # 계정 컬럼
-    ar_col = next((c for c in df.columns if "채권계정" in str(c)), None)
-    hkont_sales_col = next((c for c in df.columns if "HKONT" in str(c) and "매출" in str(c)), None)
-    hkont_purchase_col = next((c for c in df.columns if "HKONT" in str(c) and ("원가" in str(c) or "상대" in str(c))), None)
-    tax_code_col = next((c for c in df.columns if "MWSKZ" in str(c) or "부가세코드" in str(c)), None)
+    ar_col = _find_column(cols, "채권계정")
+    hkont_sales_col = _find_column(cols, "HKONT", "매출")
+    hkont_purchase_col = _find_column(cols, "HKONT", ("원가", "상대"))
+    tax_code_col = _find_column(cols, ("MWSKZ", "부가세코드"))
 
     if not partner_col:
         return profiles
 
-    # BP별 그룹화
+    # BP별 그룹화 - 컬럼별 대표값을 그룹 전체에 대해 한 번에 계산
     grouped = df.groupby(partner_col)
+    row_counts = grouped.size()
+    # 그룹 -> 값 dict로 만들어 두고 루프에서는 조회만 (빈 값은 dict에 없음)
+    first_vals = {
+        col: grouped[col].first().dropna().to_dict() for col in (tax_no_col, name_col) if col
+    }
+    mode_vals = {
+        col: _group_mode(df, partner_col, col).to_dict()
+        for col in (waers_col, ar_col, hkont_sales_col, hkont_purchase_col, tax_code_col)
+        if col
+    }
 
-    for bp, group in grouped:
-        if pd.isna(bp):
-            continue
-
-        bp_str = str(int(bp)) if isinstance(bp, (int, float)) else str(bp)
-
-        # 통화 (첫 번째 값 또는 가장 많은 값)
-        currency = "KRW"
-        if waers_col:
-            currencies = group[waers_col].dropna()
-            if len(currencies) > 0:
-                currency = str(currencies.mode().iloc[0]) if len(currencies.mode()) > 0 else str(currencies.iloc[0])
-
+    def first_of(col, bp) -> str | None:
+        """그룹의 첫 번째 값 (빈 값 제외)"""
+        val = first_vals[col].get(bp) if col else None
+        return None if val is None else str(val)
+
+    def mode_of(col, bp):
+        """그룹의 최빈값 (빈 값 제외)"""
+        return mode_vals[col].get(bp) if col else None
+
+    def account_of(col, bp) -> str | None:
+        """그룹에서 가장 많이 사용된 계정코드"""
+        acc = mode_of(col, bp)
+        return None if acc is None else _account_code_str(acc)
+
+    bp_strs = [str(int(bp)) if isinstance(bp, (int, float)) else str(bp) for bp in row_counts.index]
+
+    # HB 회사 매칭 (BP번호로) / 기존 프로필 - IN 쿼리 두 번으로 일괄 조회
+    hb_by_bp: dict[str, HBCompany] = {}
+    for company in db.execute(
+        select(HBCompany).where(HBCompany.bp_number.in_(bp_strs)).order_by(HBCompany.seq)
+    ).scalars():
+        hb_by_bp.setdefault(company.bp_number, company)
+
+    profile_by_company: dict[int, CompanyBillingProfile] = {}
+    if hb_by_bp:
+        for profile in db.execute(
+            select(CompanyBillingProfile)
+            .where(CompanyBillingProfile.company_seq.in_([c.seq for c in hb_by_bp.values()]))
+            .order_by(CompanyBillingProfile.id)
+        ).scalars():
+            profile_by_company.setdefault(profile.company_seq, profile)
+
+    for bp, bp_str, row_count in zip(row_counts.index, bp_strs, row_counts):
+
+        # 통화 (가장 많은 값)
+        currency = mode_of(waers_col, bp)
+        currency = "KRW" if currency is None else str(currency)
         is_overseas = currency != "KRW"
 
-        # 사업자번호
-        tax_number = None
-        if tax_no_col:
-            tax_vals = group[tax_no_col].dropna()
-            if len(tax_vals) > 0:
-                tax_number = str(tax_vals.iloc[0])
-
-        # 거래처명
-        company_name = None
-        if name_col:
-            name_vals = group[name_col].dropna()
-            if len(name_vals) > 0:
-                company_name = str(name_vals.iloc[0])
+        # 사업자번호, 거래처명
+        tax_number = first_of(tax_no_col, bp)
+        company_name = first_of(name_col, bp)
 
         # 계정코드 (가장 많이 사용된 값)
-        ar_account = None
-        if ar_col:
-            ar_vals = group[ar_col].dropna()
-            if len(ar_vals) > 0:
-                ar_account = str(int(ar_vals.mode().iloc[0])) if len(ar_vals.mode()) > 0 else str(int(ar_vals.iloc[0]))
-
-        hkont_sales = None
-        if hkont_sales_col:
-            hkont_vals = group[hkont_sales_col].dropna()
-            if len(hkont_vals) > 0:
-                hkont_sales = str(int(hkont_vals.mode().iloc[0])) if len(hkont_vals.mode()) > 0 else str(int(hkont_vals.iloc[0]))
-
-        hkont_purchase = None
-        if hkont_purchase_col:
-            hkont_vals = group[hkont_purchase_col].dropna()
-            if len(hkont_vals) > 0:
-                hkont_purchase = str(int(hkont_vals.mode().iloc[0])) if len(hkont_vals.mode()) > 0 else str(int(hkont_vals.iloc[0]))
-
-        tax_code = None
-        if tax_code_col:
-            tax_vals = group[tax_code_col].dropna()
-            if len(tax_vals) > 0:
-                tax_code = str(tax_vals.mode().iloc[0]) if len(tax_vals.mode()) > 0 else str(tax_vals.iloc[0])
-
-        # HB 회사 매칭 (BP번호로)
-        hb_company = db.execute(
-            select(HBCompany).where(HBCompany.bp_number == bp_str)
-        ).scalar_one_or_none()
-
-        # 기존 프로필 확인
-        existing_profile = None
-        if hb_company:
-            existing_profile = db.execute(
-                select(CompanyBillingProfile).where(
-                    CompanyBillingProfile.company_seq == hb_company.seq
-                )
-            ).scalar_one_or_none()
+        ar_account = account_of(ar_col, bp)
+        hkont_sales = account_of(hkont_sales_col, bp)
+        hkont_purchase = account_of(hkont_purchase_col, bp)
+
+        tax_code = mode_of(tax_code_col, bp)
+        if tax_code is not None:
+            tax_code = str(tax_code)
 
-        profiles.append(ExtractedProfile(
+        hb_company = hb_by_bp.get(bp_str)
+        existing_profile = profile_by_company.get(hb_company.seq) if hb_company else None
+
+        # 필드 값은 모두 위에서 str/int/bool/None으로 정리됨 - 검증 없이 생성
+        profiles.append(ExtractedProfile.model_construct(
             bp_number=bp_str,
             tax_number=tax_number,
             company_name=company_name,
@@ -657,7 +869,7 @@ def extract_profiles_from_df(df: pd.DataFrame, slip_type: str, db: Session) -> l
             hkont_sales=hkont_sales,
             hkont_purchase=hkont_purchase,
             tax_code=tax_code,
-            row_count=len(group),
+            row_count=int(row_count),
             hb_company_seq=hb_company.seq if hb_company else None,
             hb_company_name=hb_company.name if hb_company else None,
             existing_profile_id=existing_profile.id if existing_profile else None,
@@ -678,7 +890,7 @@ async def extract_profiles_from_file(
         raise HTTPException(status_code=400, detail="xlsx 또는 xls 파일만 지원합니다.")
 
     content = await file.read()
-    df = pd.read_excel(BytesIO(content), header=0)
+    df = await asyncio.to_thread(_parse_slip, BytesIO(content), _content_key(content))
 
     # 전표 유형 감지
     slip_type = detect_slip_type(list(df.columns))
@@ -710,7 +922,7 @@ async def extract_profiles_from_path(
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"파일을 찾을 수 없습니다: {file_path}")
 
-    df = pd.read_excel(path, header=0)
+    df = await asyncio.to_thread(_parse_slip, path, _path_key(path))
 
     # 전표 유형 감지
     slip_type = detect_slip_type(list(df.columns))
@@ -740,47 +952,62 @@ async def apply_profiles(
     updated = 0
     skipped = 0
 
+    # 기존 프로필 확인 (IN 쿼리 한 번으로 company_seq -> id)
+    seqs = {p.get("hb_company_seq") for p in request.profiles if p.get("hb_company_seq")}
+    existing_ids: dict[int, int] = {}
+    if seqs:
+        existing_ids = dict(
+            db.execute(
+                select(CompanyBillingProfile.company_seq, CompanyBillingProfile.id).where(
+                    CompanyBillingProfile.company_seq.in_(seqs),
+                    CompanyBillingProfile.vendor == request.vendor,
+                )
+            ).all()
+        )
+
+    new_rows: dict[int, dict] = {}  # company_seq -> 신규 행
+    changes_by_id: dict[int, dict] = {}  # 기존 프로필 id -> 변경 필드
+
     for profile_data in request.profiles:
         company_seq = profile_data.get("hb_company_seq")
         if not company_seq:
             skipped += 1
             continue
 
-        # 기존 프로필 확인
-        existing = db.execute(
-            select(CompanyBillingProfile).where(
-                CompanyBillingProfile.company_seq == company_seq,
-                CompanyBillingProfile.vendor == request.vendor,
-            )
-        ).scalar_one_or_none()
-
-        if existing:
+        if company_seq in existing_ids or company_seq in new_rows:
             if request.overwrite:
-                # 업데이트
-                if profile_data.get("currency"):
-                    existing.currency = profile_data["currency"]
-                if profile_data.get("ar_account"):
-                    existing.ar_account = profile_data["ar_account"]
-                if profile_data.get("hkont_sales"):
-                    existing.hkont_sales = profile_data["hkont_sales"]
-                if profile_data.get("hkont_purchase"):
-                    existing.hkont_purchase = profile_data["hkont_purchase"]
+                # 업데이트 (값이 있는 필드만)
+                changes = {
+                    field: profile_data[field]
+                    for field in ("currency", "ar_account", "hkont_sales", "hkont_purchase")
+                    if profile_data.get(field)
+                }
+                if company_seq in new_rows:
+                    new_rows[company_seq].update(changes)
+                else:
+                    changes_by_id.setdefault(existing_ids[company_seq], {}).update(changes)
                 updated += 1
             else:
                 skipped += 1
         else:
             # 신규 생성
-            new_profile = CompanyBillingProfile(
-                company_seq=company_seq,
-                vendor=request.vendor,
-                currency=profile_data.get("currency", "KRW"),
-                ar_account=profile_data.get("ar_account"),
-                hkont_sales=profile_data.get("hkont_sales"),
-                hkont_purchase=profile_data.get("hkont_purchase"),
-            )
-            db.add(new_profile)
+            new_rows[company_seq] = {
+                "company_seq": company_seq,
+                "vendor": request.vendor,
+                "currency": profile_data.get("currency", "KRW"),
+                "ar_account": profile_data.get("ar_account"),
+                "hkont_sales": profile_data.get("hkont_sales"),
+                "hkont_purchase": profile_data.get("hkont_purchase"),
+            }
             created += 1
 
+    # 신규/변경분을 각각 한 번의 executemany로 반영
+    if new_rows:
+        db.execute(insert(CompanyBillingProfile), list(new_rows.values()))
+    update_rows = [{"id": pk, **changes} for pk, changes in changes_by_id.items() if changes]
+    if update_rows:
+        db.execute(update(CompanyBillingProfile), update_rows)
+
     db.commit()
 
     return {
@@ -795,12 +1022,15 @@ async def apply_profiles(
 
 
 @router.get("/{template_id}", response_model=TemplateResponse)
-async def get_template(template_id: int, db: Session = Depends(get_db)):
+async def get_template(template_id: int, request: Request, db: Session = Depends(get_db)):
     """템플릿 상세 조회"""
     template = db.get(SlipTemplate, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="템플릿을 찾을 수 없습니다.")
-    return template
+    body = _template_adapter.dump_json(
+        _template_adapter.validate_python(template, from_attributes=True)
+    )
+    return _etag_json_response(request, body)
 
 
 @router.patch("/{template_id}", response_model=TemplateResponse)
@@ -2,19 +2,32 @@
 분할 청구 관리 API (1 UID → N 법인 배분)
 """
 
+import math
+import threading
+import time
 from datetime import date
 from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import NamedTuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import delete, func, insert, or_, update
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.billing_profile import SplitBillingAllocation, SplitBillingRule, SplitType
 from app.models.hb import HBCompany, HBContract, HBVendorAccount
 
 router = APIRouter(prefix="/api/split-billing", tags=["split-billing"])
 
+# 응답/배분 계산에 쓰는 대상 법인 컬럼만 로드
+_TARGET_COMPANY_COLUMNS = (HBCompany.seq, HBCompany.name, HBCompany.bp_number)
+
+# 배분 계산에 반복 사용하는 Decimal 상수
+_CENT = Decimal("0.01")
+_HUNDRED = Decimal("100")
+
 
 # ===== Request/Response 모델 =====
 
@@ -54,7 +67,62 @@ class AllocationUpdate(BaseModel):
 class SimulateRequest(BaseModel):
     source_account_id: str  # UID
     amount_usd: float
-    billing_cycle: str  # YYYYMM
+    billing_cycle: str = Field(pattern=r"^[0-9]{4}(0[1-9]|1[0-2])$")  # YYYYMM (형식 오류는 422)
+
+
+class AllocationListItem(BaseModel):
+    id: int
+    target_company_seq: int
+    target_company_name: str | None
+    split_type: str
+    split_value: float
+    priority: int
+
+
+class SplitRuleListItem(BaseModel):
+    id: int
+    name: str | None
+    source_account_id: str
+    source_account_name: str | None
+    source_contract_seq: int
+    source_contract_name: str | None
+    effective_from: str | None
+    effective_to: str | None
+    is_active: bool
+    allocation_count: int
+    allocations: list[AllocationListItem]
+
+
+class SplitRuleListResponse(BaseModel):
+    total: int
+    data: list[SplitRuleListItem]
+
+
+class AllocationDetail(BaseModel):
+    id: int
+    target_company_seq: int
+    target_company_name: str | None
+    target_company_bp: str | None
+    split_type: str
+    split_value: float
+    priority: int
+    note: str | None
+
+
+class SplitRuleDetail(BaseModel):
+    id: int
+    name: str | None
+    source_account_id: str
+    source_account_name: str | None
+    source_contract_seq: int
+    source_contract_name: str | None
+    source_company_name: str | None
+    effective_from: str | None
+    effective_to: str | None
+    is_active: bool
+    allocations: list[AllocationDetail]
+    created_at: str | None
+    updated_at: str | None
 
 
 # ===== API 엔드포인트 =====
@@ -63,28 +131,46 @@ class SimulateRequest(BaseModel):
 @router.post("/rules")
 def create_split_rule(data: SplitRuleCreate, db: Session = Depends(get_db)):
     """분할 청구 규칙 생성"""
-    # 소스 계정 확인
-    account = db.query(HBVendorAccount).filter(HBVendorAccount.id == data.source_account_id).first()
+    # 비율 합계 검증 (100% 초과 불가) - DB 조회 전에 먼저 거름, fsum으로 부동소수 누적 오차 제거
+    total_percentage = math.fsum(
+        alloc.split_value
+        for alloc in data.allocations
+        if alloc.split_type == SplitType.PERCENTAGE.value
+    )
+    if total_percentage > 100 + 1e-9:
+        raise HTTPException(status_code=400, detail=f"Total percentage ({total_percentage}%) exceeds 100%")
+
+    # 소스 계정 확인 (존재 여부만 보므로 PK만 조회)
+    account = (
+        db.query(HBVendorAccount.id).filter(HBVendorAccount.id == data.source_account_id).first()
+    )
     if not account:
         raise HTTPException(status_code=404, detail="Source account (UID) not found")
 
     # 소스 계약 확인
-    contract = db.query(HBContract).filter(HBContract.seq == data.source_contract_seq).first()
+    contract = db.query(HBContract.seq).filter(HBContract.seq == data.source_contract_seq).first()
     if not contract:
         raise HTTPException(status_code=404, detail="Source contract not found")
 
-    # 배분 대상 검증
-    total_percentage = 0
-    for alloc in data.allocations:
-        company = db.query(HBCompany).filter(HBCompany.seq == alloc.target_company_seq).first()
-        if not company:
-            raise HTTPException(status_code=404, detail=f"Target company {alloc.target_company_seq} not found")
-        if alloc.split_type == SplitType.PERCENTAGE.value:
-            total_percentage += alloc.split_value
-
-    # 비율 합계 검증 (100% 초과 불가)
-    if total_percentage > 100:
-        raise HTTPException(status_code=400, detail=f"Total percentage ({total_percentage}%) exceeds 100%")
+    # 배분 대상 검증 (대상 법인을 IN 쿼리 한 번으로 확인)
+    target_seqs = {alloc.target_company_seq for alloc in data.allocations}
+    found_seqs = set()
+    if target_seqs:
+        found_seqs = {
+            seq for (seq,) in db.query(HBCompany.seq).filter(HBCompany.seq.in_(target_seqs))
+        }
+    missing = list(dict.fromkeys(
+        alloc.target_company_seq
+        for alloc in data.allocations
+        if alloc.target_company_seq not in found_seqs
+    ))
+    if len(missing) == 1:
+        raise HTTPException(status_code=404, detail=f"Target company {missing[0]} not found")
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Target companies {', '.join(map(str, missing))} not found",
+        )
 
     # 규칙 생성
     rule = SplitBillingRule(
@@ -97,19 +183,25 @@ def create_split_rule(data: SplitRuleCreate, db: Session = Depends(get_db)):
     db.add(rule)
     db.flush()  # ID 생성
 
-    # 배분 생성
-    for alloc in data.allocations:
-        allocation = SplitBillingAllocation(
-            rule_id=rule.id,
-            target_company_seq=alloc.target_company_seq,
-            split_type=alloc.split_type,
-            split_value=alloc.split_value,
-            priority=alloc.priority,
-            note=alloc.note,
+    # 배분 생성 (한 번의 executemany)
+    if data.allocations:
+        db.execute(
+            insert(SplitBillingAllocation),
+            [
+                {
+                    "rule_id": rule.id,
+                    "target_company_seq": alloc.target_company_seq,
+                    "split_type": alloc.split_type,
+                    "split_value": alloc.split_value,
+                    "priority": alloc.priority,
+                    "note": alloc.note,
+                }
+                for alloc in data.allocations
+            ],
         )
-        db.add(allocation)
 
     db.commit()
+    _invalidate_rule_cache()
     db.refresh(rule)
 
     return {
@@ -120,75 +212,114 @@ def create_split_rule(data: SplitRuleCreate, db: Session = Depends(get_db)):
     }
 
 
-@router.get("/rules")
+@router.get("/rules", response_model=SplitRuleListResponse)
 def get_split_rules(
     source_account_id: str | None = Query(None),
     source_contract_seq: int | None = Query(None),
     is_active: bool | None = Query(None),
     limit: int = Query(100, le=500),
     offset: int = Query(0),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """분할 청구 규칙 목록 조회"""
-    query = (
-        db.query(SplitBillingRule)
-        .options(
-            joinedload(SplitBillingRule.source_account),
-            joinedload(SplitBillingRule.source_contract),
-            joinedload(SplitBillingRule.allocations).joinedload(SplitBillingAllocation.target_company),
-        )
-    )
-
+    filters = []
     if source_account_id:
-        query = query.filter(SplitBillingRule.source_account_id == source_account_id)
+        filters.append(SplitBillingRule.source_account_id == source_account_id)
     if source_contract_seq:
-        query = query.filter(SplitBillingRule.source_contract_seq == source_contract_seq)
+        filters.append(SplitBillingRule.source_contract_seq == source_contract_seq)
     if is_active is not None:
-        query = query.filter(SplitBillingRule.is_active == is_active)
+        filters.append(SplitBillingRule.is_active == is_active)
 
-    total = query.count()
-    rules = query.order_by(SplitBillingRule.created_at.desc()).offset(offset).limit(limit).all()
+    # 전체 건수는 창 함수로 페이지와 같은 쿼리에서 받음 (COUNT 쿼리 왕복 제거)
+    rows = (
+        db.query(SplitBillingRule, func.count().over().label("total"))
+        .options(
+            # 컬렉션은 selectin으로
+            # (joined면 페이지네이션이 서브쿼리로 감싸지고 행이 배분 수만큼 늘어남)
+            selectinload(SplitBillingRule.allocations)
+            .joinedload(SplitBillingAllocation.target_company)
+            .load_only(*_TARGET_COMPANY_COLUMNS),
+        )
+        .filter(*filters)
+        .order_by(SplitBillingRule.created_at.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    rules = [row[0] for row in rows]
+
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # 마지막 페이지를 넘기면 창 함수 값을 받을 행이 없으므로 건수만 따로 조회
+        total = db.query(func.count(SplitBillingRule.id)).filter(*filters).scalar()
+    else:
+        total = 0
+
+    # 계정/계약 이름은 조인 대신 페이지의 ID로 IN 조회 (결과 행 폭을 좁게 유지)
+    account_ids = {r.source_account_id for r in rules}
+    contract_seqs = {r.source_contract_seq for r in rules}
+    account_names: dict[str, str | None] = {}
+    contract_names: dict[int, str | None] = {}
+    if rules:
+        account_names = dict(
+            db.query(HBVendorAccount.id, HBVendorAccount.name).filter(
+                HBVendorAccount.id.in_(account_ids)
+            )
+        )
+        contract_names = dict(
+            db.query(HBContract.seq, HBContract.name).filter(HBContract.seq.in_(contract_seqs))
+        )
 
-    return {
-        "total": total,
-        "data": [
-            {
-                "id": r.id,
-                "name": r.name,
-                "source_account_id": r.source_account_id,
-                "source_account_name": r.source_account.name if r.source_account else None,
-                "source_contract_seq": r.source_contract_seq,
-                "source_contract_name": r.source_contract.name if r.source_contract else None,
-                "effective_from": str(r.effective_from) if r.effective_from else None,
-                "effective_to": str(r.effective_to) if r.effective_to else None,
-                "is_active": r.is_active,
-                "allocation_count": len(r.allocations),
-                "allocations": [
-                    {
-                        "id": a.id,
-                        "target_company_seq": a.target_company_seq,
-                        "target_company_name": a.target_company.name if a.target_company else None,
-                        "split_type": a.split_type,
-                        "split_value": a.split_value,
-                        "priority": a.priority,
-                    }
-                    for a in sorted(r.allocations, key=lambda x: (x.priority, x.id))
-                ],
-            }
-            for r in rules
-        ],
-    }
+    # ORM에서 바로 만든 값이므로 검증 없이 구성하고 pydantic-core로 직렬화
+    # 규칙별 배분 목록을 한 번만 순회해 만들고 건수는 만든 목록에서 계산
+    data = []
+    for r in rules:
+        allocations = [
+            AllocationListItem.model_construct(
+                id=a.id,
+                target_company_seq=a.target_company_seq,
+                target_company_name=a.target_company.name if a.target_company else None,
+                split_type=a.split_type,
+                split_value=a.split_value,
+                priority=a.priority,
+            )
+            for a in r.allocations
+        ]
+        data.append(
+            SplitRuleListItem.model_construct(
+                id=r.id,
+                name=r.name,
+                source_account_id=r.source_account_id,
+                source_account_name=account_names.get(r.source_account_id),
+                source_contract_seq=r.source_contract_seq,
+                source_contract_name=contract_names.get(r.source_contract_seq),
+                effective_from=str(r.effective_from) if r.effective_from else None,
+                effective_to=str(r.effective_to) if r.effective_to else None,
+                is_active=r.is_active,
+                allocation_count=len(allocations),
+                allocations=allocations,
+            )
+        )
 
+    response = SplitRuleListResponse.model_construct(total=total, data=data)
+    return Response(content=response.model_dump_json(), media_type="application/json")
 
-@router.get("/rules/{rule_id}")
-def get_split_rule(rule_id: int, db: Session = Depends(get_db)):
+
+@router.get("/rules/{rule_id}", response_model=SplitRuleDetail)
+def get_split_rule(rule_id: int, db: Session = Depends(get_read_db)):
     """분할 청구 규칙 상세 조회"""
     rule = (
         db.query(SplitBillingRule)
         .options(
-            joinedload(SplitBillingRule.source_account),
-            joinedload(SplitBillingRule.source_contract).joinedload(HBContract.company),
-            joinedload(SplitBillingRule.allocations).joinedload(SplitBillingAllocation.target_company),
+            joinedload(SplitBillingRule.source_account).load_only(HBVendorAccount.name),
+            joinedload(SplitBillingRule.source_contract)
+            .load_only(HBContract.name)
+            .joinedload(HBContract.company)
+            .load_only(HBCompany.name),
+            joinedload(SplitBillingRule.allocations)
+            .joinedload(SplitBillingAllocation.target_company)
+            .load_only(*_TARGET_COMPANY_COLUMNS),
         )
         .filter(SplitBillingRule.id == rule_id)
         .first()
@@ -196,35 +327,36 @@ def get_split_rule(rule_id: int, db: Session = Depends(get_db)):
     if not rule:
         raise HTTPException(status_code=404, detail="Split billing rule not found")
 
-    return {
-        "id": rule.id,
-        "name": rule.name,
-        "source_account_id": rule.source_account_id,
-        "source_account_name": rule.source_account.name if rule.source_account else None,
-        "source_contract_seq": rule.source_contract_seq,
-        "source_contract_name": rule.source_contract.name if rule.source_contract else None,
-        "source_company_name": (
+    response = SplitRuleDetail.model_construct(
+        id=rule.id,
+        name=rule.name,
+        source_account_id=rule.source_account_id,
+        source_account_name=rule.source_account.name if rule.source_account else None,
+        source_contract_seq=rule.source_contract_seq,
+        source_contract_name=rule.source_contract.name if rule.source_contract else None,
+        source_company_name=(
             rule.source_contract.company.name if rule.source_contract and rule.source_contract.company else None
         ),
-        "effective_from": str(rule.effective_from) if rule.effective_from else None,
-        "effective_to": str(rule.effective_to) if rule.effective_to else None,
-        "is_active": rule.is_active,
-        "allocations": [
-            {
-                "id": a.id,
-                "target_company_seq": a.target_company_seq,
-                "target_company_name": a.target_company.name if a.target_company else None,
-                "target_company_bp": a.target_company.bp_number if a.target_company else None,
-                "split_type": a.split_type,
-                "split_value": a.split_value,
-                "priority": a.priority,
-                "note": a.note,
-            }
-            for a in sorted(rule.allocations, key=lambda x: (x.priority, x.id))
+        effective_from=str(rule.effective_from) if rule.effective_from else None,
+        effective_to=str(rule.effective_to) if rule.effective_to else None,
+        is_active=rule.is_active,
+        allocations=[
+            AllocationDetail.model_construct(
+                id=a.id,
+                target_company_seq=a.target_company_seq,
+                target_company_name=a.target_company.name if a.target_company else None,
+                target_company_bp=a.target_company.bp_number if a.target_company else None,
+                split_type=a.split_type,
+                split_value=a.split_value,
+                priority=a.priority,
+                note=a.note,
+            )
+            for a in rule.allocations
         ],
-        "created_at": rule.created_at.isoformat() if rule.created_at else None,
-        "updated_at": rule.updated_at.isoformat() if rule.updated_at else None,
-    }
+        created_at=rule.created_at.isoformat() if rule.created_at else None,
+        updated_at=rule.updated_at.isoformat() if rule.updated_at else None,
+    )
+    return Response(content=response.model_dump_json(), media_type="application/json")
 
 
 @router.patch("/rules/{rule_id}")
@@ -232,27 +364,40 @@ def update_split_rule(
     rule_id: int, data: SplitRuleUpdate, db: Session = Depends(get_db)
 ):
     """분할 청구 규칙 수정"""
-    rule = db.query(SplitBillingRule).filter(SplitBillingRule.id == rule_id).first()
-    if not rule:
+    # 조회 없이 UPDATE 한 번으로 수정하고 영향 행 수로 존재 여부 확인
+    result = db.execute(
+        update(SplitBillingRule)
+        .where(SplitBillingRule.id == rule_id)
+        .values(**data.model_dump(exclude_unset=True))
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="Split billing rule not found")
 
-    update_data = data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(rule, key, value)
-
     db.commit()
+    _invalidate_rule_cache()
     return {"success": True, "id": rule_id}
 
 
 @router.delete("/rules/{rule_id}")
 def delete_split_rule(rule_id: int, db: Session = Depends(get_db)):
     """분할 청구 규칙 삭제 (배분도 함께 삭제)"""
-    rule = db.query(SplitBillingRule).filter(SplitBillingRule.id == rule_id).first()
-    if not rule:
+    # ORM cascade는 배분을 SELECT 후 건별 DELETE - 배분/규칙을 각각 한 번의 DELETE로 처리
+    db.execute(
+        delete(SplitBillingAllocation)
+        .where(SplitBillingAllocation.rule_id == rule_id)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(
+        delete(SplitBillingRule)
+        .where(SplitBillingRule.id == rule_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Split billing rule not found")
 
-    db.delete(rule)
     db.commit()
+    _invalidate_rule_cache()
     return {"success": True, "deleted_id": rule_id}
 
 
@@ -282,6 +427,7 @@ def add_allocation(
     )
     db.add(allocation)
     db.commit()
+    _invalidate_rule_cache()
     db.refresh(allocation)
 
     return {"success": True, "id": allocation.id}
@@ -292,19 +438,23 @@ def update_allocation(
     allocation_id: int, data: AllocationUpdate, db: Session = Depends(get_db)
 ):
     """배분 대상 수정"""
-    allocation = (
-        db.query(SplitBillingAllocation)
-        .filter(SplitBillingAllocation.id == allocation_id)
-        .first()
-    )
-    if not allocation:
-        raise HTTPException(status_code=404, detail="Allocation not found")
-
     update_data = data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(allocation, key, value)
+    if update_data:
+        # 조회 없이 UPDATE 한 번으로 수정하고 영향 행 수로 존재 여부 확인
+        found = db.execute(
+            update(SplitBillingAllocation)
+            .where(SplitBillingAllocation.id == allocation_id)
+            .values(**update_data)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    else:
+        # 바꿀 값이 없으면 존재 여부만 확인
+        found = db.get(SplitBillingAllocation, allocation_id) is not None
+    if not found:
+        raise HTTPException(status_code=404, detail="Allocation not found")
 
     db.commit()
+    _invalidate_rule_cache()
     return {"success": True, "id": allocation_id}
 
 
@@ -321,6 +471,7 @@ def delete_allocation(allocation_id: int, db: Session = Depends(get_db)):
 
     db.delete(allocation)
     db.commit()
+    _invalidate_rule_cache()
     return {"success": True, "deleted_id": allocation_id}
 
 
@@ -328,12 +479,24 @@ def delete_allocation(allocation_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/simulate")
-def simulate_split(data: SimulateRequest, db: Session = Depends(get_db)):
-    """분할 청구 시뮬레이션"""
+def simulate_split(
+    data: SimulateRequest | list[SimulateRequest], db: Session = Depends(get_db)
+):
+    """분할 청구 시뮬레이션 (목록으로 보내면 규칙을 한 번에 조회해 건별 결과 목록 반환)"""
+    if isinstance(data, list):
+        results = calculate_split_amounts_bulk(
+            db, [(d.source_account_id, d.amount_usd, d.billing_cycle) for d in data]
+        )
+        return [_simulate_response(d, result) for d, result in zip(data, results)]
+
     result = calculate_split_amounts(
         db, data.source_account_id, data.amount_usd, data.billing_cycle
     )
+    return _simulate_response(data, result)
 
+
+def _simulate_response(data: SimulateRequest, result: dict | None) -> dict:
+    """시뮬레이션 응답 생성"""
     if not result:
         return {
             "success": False,
@@ -354,6 +517,15 @@ def simulate_split(data: SimulateRequest, db: Session = Depends(get_db)):
     }
 
 
+# 배분 계산용 규칙 조회 옵션 - 배분/대상 법인은 함께 로드하고 그 외 관계는 지연 로드 대신 예외
+_RULE_ALLOCATION_OPTIONS = (
+    joinedload(SplitBillingRule.allocations)
+    .joinedload(SplitBillingAllocation.target_company)
+    .load_only(*_TARGET_COMPANY_COLUMNS),
+    raiseload("*"),
+)
+
+
 def calculate_split_amounts(
     db: Session,
     source_account_id: str,
@@ -373,72 +545,271 @@ def calculate_split_amounts(
         None: 분할 규칙 없음
         dict: 분할 결과
     """
-    # 정산월을 날짜로 변환
-    year = int(billing_cycle[:4])
-    month = int(billing_cycle[4:6])
-    cycle_date = date(year, month, 1)
+    return calculate_split_amounts_bulk(db, [(source_account_id, amount_usd, billing_cycle)])[0]
 
-    # 해당 UID의 활성 분할 규칙 조회
-    rule = (
-        db.query(SplitBillingRule)
-        .options(
-            joinedload(SplitBillingRule.allocations).joinedload(SplitBillingAllocation.target_company)
+
+def calculate_split_amounts_bulk(
+    db: Session,
+    rows: list[tuple[str, float, str]],
+) -> list[dict | None]:
+    """
+    여러 건의 분할 청구 금액 계산 (규칙은 캐시에 없는 UID만 IN 쿼리 한 번으로 조회)
+
+    Args:
+        db: DB 세션
+        rows: (원본 UID, 원본 금액(USD), 정산월) 목록
+
+    Returns:
+        rows와 같은 순서의 결과 목록 (분할 규칙 없으면 None)
+    """
+    snapshots = _cached_rule_snapshots(db, {uid for uid, _, _ in rows})
+
+    # 적용 규칙 선택은 (UID, 정산월)마다 한 번만 하고 건별로는 금액 계산만
+    selected: dict[tuple[str, str], _RuleSnapshot | None] = {}
+
+    results = []
+    for uid, amount_usd, billing_cycle in rows:
+        key = (uid, billing_cycle)
+        if key not in selected:
+            selected[key] = select_split_rule(snapshots.get(uid, ()), billing_cycle)
+        snapshot = selected[key]
+        if snapshot is None:
+            results.append(None)
+            continue
+
+        results.append(_allocate_with_plan(snapshot, snapshot.plan, amount_usd))
+
+    _fill_target_companies(db, results)
+    return results
+
+
+def _fill_target_companies(db: Session, results: list[dict | None]) -> None:
+    """배분 결과에 대상 법인명/BP 채우기 (캐시된 값 대신 현재 HB 법인 정보를 한 번에 조회)"""
+    allocations = [alloc for result in results if result for alloc in result["allocations"]]
+    if not allocations:
+        return
+
+    companies = {
+        seq: (name, bp_number)
+        for seq, name, bp_number in db.query(*_TARGET_COMPANY_COLUMNS).filter(
+            HBCompany.seq.in_({alloc["target_company_seq"] for alloc in allocations})
         )
-        .filter(
-            SplitBillingRule.source_account_id == source_account_id,
-            SplitBillingRule.is_active == True,
+    }
+    for alloc in allocations:
+        alloc["target_company_name"], alloc["target_company_bp"] = companies.get(
+            alloc["target_company_seq"], (None, None)
         )
-        .first()
-    )
 
-    if not rule:
+
+class _RuleSnapshot(NamedTuple):
+    """세션과 분리된 분할 규칙 값 (캐시 보관용)"""
+
+    id: int
+    name: str
+    effective_from: date | None
+    effective_to: date | None
+    plan: tuple[tuple[bool, Decimal, dict], ...]
+
+
+# UID → (활성 규칙 스냅샷 목록 - id 순, 저장 시각). 규칙/배분 변경 API에서 비우고,
+# 다른 워커의 변경은 TTL 안에 반영. 캐시는 프로세스별이라 이 프로세스의 변경 API만 즉시 반영됨.
+# 대상 법인명/BP는 HB 동기화로 바뀔 수 있어 캐시하지 않고 계산할 때마다 조회
+_RULE_CACHE_TTL = 60.0
+_RULE_CACHE_MAX = 10_000
+_rule_cache: dict[str, tuple[tuple[_RuleSnapshot, ...], float]] = {}
+_rule_cache_lock = threading.Lock()
+# 캐시를 비울 때마다 증가 - 비우기 전에 조회를 시작한 요청이 이전 규칙을 다시 저장하지 않도록 비교
+_rule_cache_generation = 0
+
+
+def _invalidate_rule_cache() -> None:
+    """분할 규칙 캐시 비우기 (변경 커밋 후 호출)"""
+    global _rule_cache_generation
+    with _rule_cache_lock:
+        _rule_cache.clear()
+        _rule_cache_generation += 1
+
+
+def _cached_rule_snapshots(
+    db: Session, uids: set[str]
+) -> dict[str, tuple[_RuleSnapshot, ...]]:
+    """UID별 활성 규칙 스냅샷 목록 (캐시에 없거나 만료된 UID만 조회)"""
+    now = time.monotonic()
+    snapshots: dict[str, tuple[_RuleSnapshot, ...]] = {}
+    with _rule_cache_lock:
+        generation = _rule_cache_generation
+        for uid in uids:
+            cached = _rule_cache.get(uid)
+            if cached and now - cached[1] < _RULE_CACHE_TTL:
+                snapshots[uid] = cached[0]
+
+    missing = [uid for uid in uids if uid not in snapshots]
+    if not missing:
+        return snapshots
+
+    rules_by_uid = get_split_rules_for_uids(db, missing)
+    loaded = {
+        uid: tuple(
+            _RuleSnapshot(
+                rule.id,
+                rule.name,
+                rule.effective_from,
+                rule.effective_to,
+                tuple(_split_plan(rule, include_company=False)),
+            )
+            for rule in rules_by_uid.get(uid, ())
+        )
+        for uid in missing
+    }
+
+    with _rule_cache_lock:
+        # 조회 중에 규칙이 변경됐으면 이번 결과는 캐시에 남기지 않음
+        if generation == _rule_cache_generation:
+            if len(_rule_cache) + len(loaded) > _RULE_CACHE_MAX:
+                _rule_cache.clear()
+            _rule_cache.update((uid, (snapshot, now)) for uid, snapshot in loaded.items())
+    snapshots.update(loaded)
+    return snapshots
+
+
+def allocate_split_amounts(
+    rule: SplitBillingRule,
+    amount_usd: float,
+    billing_cycle: str,
+) -> dict | None:
+    """
+    조회된 분할 규칙으로 금액 배분 (allocations/target_company 로드 필요)
+
+    Returns:
+        None: 정산월이 규칙 유효 기간 밖
+        dict: 분할 결과
+    """
+    if not _rule_applies(rule, billing_cycle):
         return None
+    return _allocate_with_plan(rule, _split_plan(rule), amount_usd)
+
+
+def select_split_rule(rules, billing_cycle: str):
+    """id 순 활성 규칙 중 정산월이 유효 기간 안인 첫 번째 규칙 (없으면 None)
+
+    일괄 조회/단건 조회/캐시 계산이 모두 같은 기준으로 규칙을 고르도록 공용으로 사용
+    """
+    for rule in rules:
+        if _rule_applies(rule, billing_cycle):
+            return rule
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _cycle_to_date(billing_cycle: str) -> date:
+    """정산월(YYYYMM)을 해당 월 1일로 변환 (같은 정산월이 반복되므로 캐시)"""
+    return date(int(billing_cycle[:4]), int(billing_cycle[4:6]), 1)
+
+
+def _rule_applies(rule: SplitBillingRule | _RuleSnapshot, billing_cycle: str) -> bool:
+    """정산월이 규칙 유효 기간 안인지"""
+    cycle_date = _cycle_to_date(billing_cycle)
 
     # 유효 기간 체크
     if rule.effective_from and rule.effective_from > cycle_date:
-        return None
+        return False
     if rule.effective_to and rule.effective_to < cycle_date:
-        return None
+        return False
+    return True
+
+
+def _split_plan(
+    rule: SplitBillingRule, include_company: bool = True
+) -> list[tuple[bool, Decimal, dict]]:
+    """배분 순서대로 (고정금액 여부, 배분값, 결과 공통 필드) - 같은 규칙의 여러 금액 배분에 재사용
+
+    include_company=False면 대상 법인명/BP는 None으로 두고 사용 시점에 채움 (캐시용)
+    """
+    plan = []
+    for alloc in rule.allocations:
+        company = alloc.target_company if include_company else None
+        plan.append(
+            (
+                alloc.split_type == SplitType.FIXED_AMOUNT.value,
+                Decimal(str(alloc.split_value)),
+                {
+                    "allocation_id": alloc.id,
+                    "target_company_seq": alloc.target_company_seq,
+                    "target_company_name": company.name if company else None,
+                    "target_company_bp": company.bp_number if company else None,
+                    "split_type": alloc.split_type,
+                    "split_value": alloc.split_value,
+                },
+            )
+        )
+    return plan
+
 
-    # 배분 계산
-    allocations = sorted(rule.allocations, key=lambda x: (x.priority, x.id))
+def _allocate_with_plan(
+    rule: SplitBillingRule | _RuleSnapshot,
+    plan: list[tuple[bool, Decimal, dict]] | tuple[tuple[bool, Decimal, dict], ...],
+    amount_usd: float,
+) -> dict:
+    """배분 계획대로 금액 배분"""
     results = []
-    remaining = Decimal(str(amount_usd))
+    amount = Decimal(str(amount_usd))  # 원본 금액은 한 번만 변환해 비율 계산에 재사용
+    remaining = amount
 
-    for alloc in allocations:
+    for is_fixed, split_value, alloc_info in plan:
         if remaining <= 0:
             break
 
-        if alloc.split_type == SplitType.FIXED_AMOUNT.value:
+        if is_fixed:
             # 고정 금액
-            alloc_amount = min(Decimal(str(alloc.split_value)), remaining)
+            alloc_amount = min(split_value, remaining)
+        elif split_value == _HUNDRED:
+            # 100% 배분 (단일 법인 규칙이 대부분) - 곱셈/나눗셈 없이 원본 금액을 그대로 반올림
+            alloc_amount = min(amount.quantize(_CENT, rounding=ROUND_HALF_UP), remaining)
         else:  # percentage
             # 비율 (원본 금액 기준)
-            alloc_amount = (Decimal(str(amount_usd)) * Decimal(str(alloc.split_value)) / Decimal("100")).quantize(
-                Decimal("0.01"), rounding=ROUND_HALF_UP
+            alloc_amount = (amount * split_value / _HUNDRED).quantize(
+                _CENT, rounding=ROUND_HALF_UP
             )
             alloc_amount = min(alloc_amount, remaining)
 
         remaining -= alloc_amount
 
-        results.append({
-            "allocation_id": alloc.id,
-            "target_company_seq": alloc.target_company_seq,
-            "target_company_name": alloc.target_company.name if alloc.target_company else None,
-            "target_company_bp": alloc.target_company.bp_number if alloc.target_company else None,
-            "split_type": alloc.split_type,
-            "split_value": alloc.split_value,
-            "allocated_amount_usd": float(alloc_amount),
-        })
+        results.append({**alloc_info, "allocated_amount_usd": float(alloc_amount)})
 
     return {
         "rule_id": rule.id,
         "rule_name": rule.name,
         "allocations": results,
-        "remaining": float(remaining.quantize(Decimal("0.01"), rounding=ROUND_DOWN)),
+        "remaining": float(remaining.quantize(_CENT, rounding=ROUND_DOWN)),
     }
 
 
+def get_split_rules_for_uids(db: Session, uids: list[str]) -> dict[str, list[SplitBillingRule]]:
+    """
+    여러 UID의 활성 분할 규칙을 한 번에 조회 (전표 생성 배치용)
+
+    정산월에 적용할 규칙은 select_split_rule로 선택
+
+    Returns:
+        UID → 활성 분할 규칙 목록 (id 순)
+    """
+    rules = (
+        db.query(SplitBillingRule)
+        .options(*_RULE_ALLOCATION_OPTIONS)
+        .filter(
+            SplitBillingRule.source_account_id.in_(uids),
+            SplitBillingRule.is_active == True,
+        )
+        .order_by(SplitBillingRule.id)
+        .all()
+    )
+
+    rules_by_uid: dict[str, list[SplitBillingRule]] = {}
+    for rule in rules:
+        rules_by_uid.setdefault(rule.source_account_id, []).append(rule)
+    return rules_by_uid
+
+
 def get_split_rule_for_uid(
     db: Session,
     uid: str,
@@ -446,30 +817,27 @@ def get_split_rule_for_uid(
 ) -> SplitBillingRule | None:
     """
     특정 UID, 정산월에 적용되는 분할 규칙 조회 (헬퍼 함수)
+
+    select_split_rule과 같은 기준 (유효 기간 안의 첫 번째 활성 규칙, id 순)
     """
-    year = int(billing_cycle[:4])
-    month = int(billing_cycle[4:6])
-    cycle_date = date(year, month, 1)
+    cycle_date = _cycle_to_date(billing_cycle)
 
-    rule = (
+    # 유효 기간도 WHERE에서 체크 (기간 밖이면 규칙을 로드하지 않음)
+    return (
         db.query(SplitBillingRule)
-        .options(
-            joinedload(SplitBillingRule.allocations).joinedload(SplitBillingAllocation.target_company)
-        )
+        .options(*_RULE_ALLOCATION_OPTIONS)
         .filter(
             SplitBillingRule.source_account_id == uid,
             SplitBillingRule.is_active == True,
+            or_(
+                SplitBillingRule.effective_from.is_(None),
+                SplitBillingRule.effective_from <= cycle_date,
+            ),
+            or_(
+                SplitBillingRule.effective_to.is_(None),
+                SplitBillingRule.effective_to >= cycle_date,
+            ),
         )
+        .order_by(SplitBillingRule.id)
         .first()
     )
-
-    if not rule:
-        return None
-
-    # 유효 기간 체크
-    if rule.effective_from and rule.effective_from > cycle_date:
-        return None
-    if rule.effective_to and rule.effective_to < cycle_date:
-        return None
-
-    return rule
@@ -5,6 +5,12 @@ class Settings(BaseSettings):
     app_name: str = "Billing Slip Automation"
     debug: bool = True
     database_url: str = "sqlite:///./billing.db"
+    read_database_url: str | None = None  # 읽기 전용 복제본 (없으면 database_url 사용)
+
+    # 전표 xlsx 파싱
+    excel_engine: str | None = None  # pandas read_excel 엔진 (예: "calamine", 없으면 openpyxl)
+    template_analyze_rows: int | None = None  # 템플릿 분석 시 읽을 최대 행 수 (없으면 전체)
+    template_sample_rows: int = 10_000  # 샘플값/고유값 판단에 쓸 앞부분 행 수
 
     class Config:
         env_file = ".env"
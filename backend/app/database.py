@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import settings
@@ -6,6 +6,27 @@ from app.config import settings
 engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 조회 전용 엔드포인트용 (복제본 미설정 시 기본 엔진 공유)
+read_engine = (
+    create_engine(settings.read_database_url, connect_args={"check_same_thread": False})
+    if settings.read_database_url
+    else engine
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def _set_sqlite_mmap(dbapi_connection, connection_record):
+    """SQLite 연결마다 mmap 크기 설정 (PRAGMA mmap_size는 파일에 저장되지 않는 연결 단위 설정)"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA mmap_size=1073741824")
+    cursor.close()
+
+
+# 조회 위주 쿼리가 pread 대신 mmap으로 페이지를 읽도록 (최대 1GB)
+for _engine in {engine, read_engine}:
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _set_sqlite_mmap)
+
 
 class Base(DeclarativeBase):
     pass
@@ -17,3 +38,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -9,11 +9,32 @@ from datetime import date, datetime
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
+# 금액/환율 컬럼 - PostgreSQL에서는 고정 소수(NUMERIC)로 저장해 SUM 등 집계가 정확하고, 파이썬 쪽은 기존처럼 float
+# (SQLite는 NUMERIC 선호형이 정수값을 int로 돌려주므로 기존 REAL 유지)
+_MONEY = Float().with_variant(Numeric(18, 4, asdecimal=False), "postgresql")
+
+# 입력 순서대로 값이 증가하는 날짜/정산월 단일 컬럼 인덱스는 postgresql_using="brin"으로 정의
+# (PostgreSQL은 BRIN, SQLite는 기존 B-tree)
+
 if TYPE_CHECKING:
     from app.models.hb import HBCompany, HBContract, HBVendorAccount
 
@@ -38,6 +59,11 @@ PAYMENT_TYPE_TAX_CODE = {
 }
 
 
+def tax_code_for(payment_type: str | None) -> str:
+    """결제 방식의 부가세코드 (매핑 없으면 A1)"""
+    return PAYMENT_TYPE_TAX_CODE.get(payment_type, "A1")
+
+
 class CompanyBillingProfile(Base):
     """회사+CSP별 청구 설정"""
 
@@ -80,6 +106,27 @@ class Deposit(Base):
     """예치금 충전 기록"""
 
     __tablename__ = "deposits"
+    __table_args__ = (
+        # FIFO 사용 조회 (미소진 예치금을 충전일 순으로) - 소진된 행은 인덱스에서 제외
+        Index(
+            "ix_deposits_contract_fifo",
+            "contract_profile_id",
+            "deposit_date",
+            postgresql_where=text("is_exhausted = false"),
+            postgresql_include=["remaining_amount", "amount"],
+            sqlite_where=text("is_exhausted = 0"),
+        ),
+        Index(
+            "ix_deposits_profile_fifo",
+            "profile_id",
+            "deposit_date",
+            postgresql_where=text("is_exhausted = false"),
+            postgresql_include=["remaining_amount", "amount"],
+            sqlite_where=text("is_exhausted = 0"),
+        ),
+        # 충전일은 대체로 입력 순서대로 증가
+        Index("ix_deposits_deposit_date", "deposit_date", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -92,13 +139,13 @@ class Deposit(Base):
     )
 
     # 충전 정보
-    deposit_date: Mapped[date] = mapped_column(Date, index=True)
-    amount: Mapped[float] = mapped_column(Float)  # 충전 금액
+    deposit_date: Mapped[date] = mapped_column(Date)
+    amount: Mapped[float] = mapped_column(_MONEY)  # 충전 금액
     currency: Mapped[str] = mapped_column(String(10), default="KRW")
-    exchange_rate: Mapped[float | None] = mapped_column(Float)  # 해외: 충전 시점 환율
+    exchange_rate: Mapped[float | None] = mapped_column(_MONEY)  # 해외: 충전 시점 환율
 
     # 잔액 추적 (FIFO용)
-    remaining_amount: Mapped[float] = mapped_column(Float)  # 남은 금액
+    remaining_amount: Mapped[float] = mapped_column(_MONEY)  # 남은 금액
     is_exhausted: Mapped[bool] = mapped_column(Boolean, default=False)  # 소진 완료
 
     # 참조
@@ -185,14 +232,18 @@ class DepositUsage(Base):
     """예치금 사용 기록"""
 
     __tablename__ = "deposit_usages"
+    __table_args__ = (
+        # 사용일은 기록 순서대로 증가
+        Index("ix_deposit_usages_usage_date", "usage_date", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     deposit_id: Mapped[int] = mapped_column(Integer, ForeignKey("deposits.id"), index=True)
 
     # 사용 정보
-    usage_date: Mapped[date] = mapped_column(Date, index=True)
-    amount: Mapped[float] = mapped_column(Float)  # 사용 금액
-    amount_krw: Mapped[float | None] = mapped_column(Float)  # KRW 환산액 (해외의 경우)
+    usage_date: Mapped[date] = mapped_column(Date)
+    amount: Mapped[float] = mapped_column(_MONEY)  # 사용 금액
+    amount_krw: Mapped[float | None] = mapped_column(_MONEY)  # KRW 환산액 (해외의 경우)
 
     # 빌링 연결
     billing_cycle: Mapped[str | None] = mapped_column(String(10))  # YYYYMM
@@ -232,6 +283,17 @@ class AdditionalCharge(Base):
     """추가 비용 항목 (RAW 빌링 외 추가 비용)"""
 
     __tablename__ = "additional_charges"
+    __table_args__ = (
+        # 전표 생성 시 계약별 활성 비용을 적용 기간으로 조회
+        Index(
+            "ix_additional_charges_active_period",
+            "contract_seq",
+            "start_date",
+            "end_date",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     contract_seq: Mapped[int] = mapped_column(Integer, ForeignKey("hb_contracts.seq"), index=True)
@@ -244,7 +306,7 @@ class AdditionalCharge(Base):
     charge_type: Mapped[str] = mapped_column(String(20), default=ChargeType.OTHER.value)
 
     # 금액 (음수 = 차감, 예: 크레딧)
-    amount: Mapped[float] = mapped_column(Float)
+    amount: Mapped[float] = mapped_column(_MONEY)
     currency: Mapped[str] = mapped_column(String(10), default="USD")
 
     # 반복 유형 및 기간
@@ -280,11 +342,17 @@ class SplitBillingRule(Base):
     """분할 청구 규칙 (1 UID → N 법인 배분)"""
 
     __tablename__ = "split_billing_rules"
+    __table_args__ = (
+        # UID별 활성 규칙 + 유효 기간 조회
+        Index(
+            "ix_split_rule_account_active", "source_account_id", "is_active", "effective_from", "effective_to"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     # 원본 소스
-    source_account_id: Mapped[str] = mapped_column(String(50), ForeignKey("hb_vendor_accounts.id"), index=True)
+    source_account_id: Mapped[str] = mapped_column(String(50), ForeignKey("hb_vendor_accounts.id"))
     source_contract_seq: Mapped[int] = mapped_column(Integer, ForeignKey("hb_contracts.seq"), index=True)
 
     # 규칙 이름 (관리용)
@@ -303,8 +371,12 @@ class SplitBillingRule(Base):
     # Relationships
     source_account: Mapped["HBVendorAccount"] = relationship("HBVendorAccount")
     source_contract: Mapped["HBContract"] = relationship("HBContract", back_populates="split_rules")
+    # 배분 순서(priority, id)대로 로드 - 응답/배분 계산에서 다시 정렬하지 않음
     allocations: Mapped[list["SplitBillingAllocation"]] = relationship(
-        "SplitBillingAllocation", back_populates="rule", cascade="all, delete-orphan"
+        "SplitBillingAllocation",
+        back_populates="rule",
+        cascade="all, delete-orphan",
+        order_by="[SplitBillingAllocation.priority, SplitBillingAllocation.id]",
     )
 
 
@@ -312,16 +384,21 @@ class SplitBillingAllocation(Base):
     """분할 청구 배분 대상"""
 
     __tablename__ = "split_billing_allocations"
+    __table_args__ = (
+        Index("ix_alloc_rule_prio", "rule_id", "priority", "id"),  # 규칙별 배분 순서 로드
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    rule_id: Mapped[int] = mapped_column(Integer, ForeignKey("split_billing_rules.id"), index=True)
+    rule_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("split_billing_rules.id", ondelete="CASCADE")
+    )
 
     # 배분 대상 회사
     target_company_seq: Mapped[int] = mapped_column(Integer, ForeignKey("hb_companies.seq"), index=True)
 
     # 분할 방식
     split_type: Mapped[str] = mapped_column(String(20), default=SplitType.PERCENTAGE.value)
-    split_value: Mapped[float] = mapped_column(Float)  # 비율(%) 또는 고정금액(USD)
+    split_value: Mapped[float] = mapped_column(_MONEY)  # 비율(%) 또는 고정금액(USD)
 
     # 우선순위 (고정금액 분할 시 순서 결정)
     priority: Mapped[int] = mapped_column(Integer, default=0)
@@ -343,12 +420,24 @@ class ProRataPeriod(Base):
     """일할 계산 기간 (월 중간 시작/종료 계약의 일할 적용)"""
 
     __tablename__ = "pro_rata_periods"
+    __table_args__ = (
+        # 계약+정산월 조회 (계약·정산월당 1건) - PostgreSQL은 비율/일수까지 인덱스에서 바로 읽음
+        Index(
+            "ix_prorata_lookup",
+            "contract_seq",
+            "billing_cycle",
+            unique=True,
+            postgresql_include=["ratio", "active_days", "total_days"],
+        ),
+        # 정산월은 등록 순서대로 증가
+        Index("ix_pro_rata_periods_billing_cycle", "billing_cycle", postgresql_using="brin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    contract_seq: Mapped[int] = mapped_column(Integer, ForeignKey("hb_contracts.seq"), index=True)
+    contract_seq: Mapped[int] = mapped_column(Integer, ForeignKey("hb_contracts.seq"))
 
     # 정산월
-    billing_cycle: Mapped[str] = mapped_column(String(10), index=True)  # YYYYMM
+    billing_cycle: Mapped[str] = mapped_column(String(10))  # YYYYMM
 
     # 일할 기간
     start_day: Mapped[int] = mapped_column(Integer)  # 시작일 (1~31)
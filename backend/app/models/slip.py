@@ -6,10 +6,25 @@ from datetime import date, datetime
 from enum import Enum
 from typing import Any
 
-from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer, String, Text, func
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    func,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.models.alibaba import BPCode  # bp_code 관계 대상 (이 모듈만 import해도 매퍼 설정)
+
+# 금액 컬럼 - billing_profile과 같이 PostgreSQL에서만 NUMERIC(18,4), 파이썬 값은 float 유지
+_MONEY = Float().with_variant(Numeric(18, 4, asdecimal=False), "postgresql")
 
 
 class RoundingRule(str, Enum):
@@ -51,14 +66,19 @@ class SlipRecord(Base):
     """생성된 전표 레코드"""
 
     __tablename__ = "slip_records"
+    __table_args__ = (
+        Index("ix_slip_batch_seq", "batch_id", "seqno"),  # 배치 내보내기 (seqno 순)
+        Index("ix_slip_batch_partner", "batch_id", "partner"),  # 확정 시 BP 누락 집계
+        Index("ix_slip_cycle_type", "billing_cycle", "slip_type"),  # 정산월/유형별 목록
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     # 전표 식별
-    batch_id: Mapped[str] = mapped_column(String(50), index=True)  # 생성 배치 ID
-    slip_type: Mapped[str] = mapped_column(String(20), index=True)  # sales(매출) / purchase(매입)
+    batch_id: Mapped[str] = mapped_column(String(50))  # 생성 배치 ID (인덱스는 배치 복합 인덱스로)
+    slip_type: Mapped[str] = mapped_column(String(20))  # sales(매출) / purchase(매입)
     vendor: Mapped[str] = mapped_column(String(50), default="alibaba")
-    billing_cycle: Mapped[str] = mapped_column(String(10), index=True)  # YYYYMM
+    billing_cycle: Mapped[str] = mapped_column(String(10))  # YYYYMM (인덱스는 ix_slip_cycle_type)
 
     # 원본 유형 (billing/additional_charge/split)
     source_type: Mapped[str] = mapped_column(String(30), default=SlipSourceType.BILLING.value)
@@ -75,6 +95,13 @@ class SlipRecord(Base):
     # 거래처
     partner: Mapped[str | None] = mapped_column(String(20))  # BP번호
     partner_name: Mapped[str | None] = mapped_column(String(200))  # 거래처명
+    # 거래처 BP (조회 전용, 지연 로딩 금지 - 필요 시 join/selectinload로 명시)
+    bp_code: Mapped["BPCode | None"] = relationship(
+        "BPCode",
+        primaryjoin="foreign(SlipRecord.partner) == BPCode.bp_number",
+        viewonly=True,
+        lazy="raise",
+    )
 
     # 계정
     ar_account: Mapped[str | None] = mapped_column(String(20))  # 채권/채무과목
@@ -82,10 +109,10 @@ class SlipRecord(Base):
     tax_code: Mapped[str | None] = mapped_column(String(10))  # 부가세코드 (A1, A3, B1 등)
 
     # 금액
-    wrbtr: Mapped[float] = mapped_column(Float, default=0)  # 통화금액 (해외: USD, 국내: KRW)
-    wrbtr_usd: Mapped[float] = mapped_column(Float, default=0)  # USD 원본 금액
-    dmbtr_c: Mapped[float | None] = mapped_column(Float)  # 원화환산액 (해외법인용 DMBTR_C)
-    exchange_rate: Mapped[float | None] = mapped_column(Float)  # 적용 환율
+    wrbtr: Mapped[float] = mapped_column(_MONEY, default=0)  # 통화금액 (해외: USD, 국내: KRW)
+    wrbtr_usd: Mapped[float] = mapped_column(_MONEY, default=0)  # USD 원본 금액
+    dmbtr_c: Mapped[float | None] = mapped_column(_MONEY)  # 원화환산액 (해외법인용 DMBTR_C)
+    exchange_rate: Mapped[float | None] = mapped_column(_MONEY)  # 적용 환율
 
     # 조직
     prctr: Mapped[str | None] = mapped_column(String(20))  # 부서코드
@@ -113,7 +140,7 @@ class SlipRecord(Base):
 
     # 일할 계산 정보
     pro_rata_ratio: Mapped[float | None] = mapped_column(Float)  # 적용된 일할 비율
-    original_amount: Mapped[float | None] = mapped_column(Float)  # 일할 계산 전 원본 금액
+    original_amount: Mapped[float | None] = mapped_column(_MONEY)  # 일할 계산 전 원본 금액
 
     # 상태
     is_confirmed: Mapped[bool] = mapped_column(Boolean, default=False)  # 확정 여부
@@ -126,10 +153,27 @@ class SlipRecord(Base):
     )
 
 
+class SlipBatch(Base):
+    """전표 배치 요약 (배치 목록 조회용, 전표 생성/수정/삭제 시 함께 갱신)"""
+
+    __tablename__ = "slip_batches"
+
+    batch_id: Mapped[str] = mapped_column(String(50), primary_key=True)
+    billing_cycle: Mapped[str] = mapped_column(String(10))  # YYYYMM
+    slip_type: Mapped[str] = mapped_column(String(20))  # sales(매출) / purchase(매입)
+    count: Mapped[int] = mapped_column(Integer, default=0)  # 전표 건수
+    total_krw: Mapped[float] = mapped_column(_MONEY, default=0)  # 통화금액(WRBTR) 합계
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
 class ExchangeRate(Base):
     """환율 정보"""
 
     __tablename__ = "exchange_rates"
+    __table_args__ = (
+        # 통화쌍 + 일자 조회 (동기화/전표 환율 조회) - 기존 중복 행이 있을 수 있어 고유 제약 없이
+        Index("ix_exchange_rates_lookup", "currency_from", "currency_to", "rate_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     currency_from: Mapped[str] = mapped_column(String(10), default="USD")
@@ -147,6 +191,16 @@ class ExchangeRate(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
+class SyncMeta(Base):
+    """외부 API 동기화 메타 정보 (조건부 요청용 ETag/Last-Modified)"""
+
+    __tablename__ = "sync_meta"
+
+    endpoint: Mapped[str] = mapped_column(String(200), primary_key=True)  # 요청 식별 키
+    etag: Mapped[str | None] = mapped_column(String(200))
+    last_modified: Mapped[str | None] = mapped_column(String(100))
+
+
 class SlipConfig(Base):
     """전표 생성 설정 (벤더별)"""
 
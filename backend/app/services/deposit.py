@@ -3,12 +3,15 @@
 from datetime import date
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.models.billing_profile import Deposit, DepositUsage
 from app.utils import round_decimal
 
+# FIFO 사용 시 예치금 행을 읽어오는 단위
+_FIFO_BATCH_SIZE = 100
+
 
 def update_deposit_fields(deposit: Deposit, data) -> None:
     """예치금 공통 필드 수정"""
@@ -35,6 +38,20 @@ def update_deposit_fields(deposit: Deposit, data) -> None:
             deposit.is_exhausted = False
 
 
+def active_balance_subquery(filter_column, owner_id_column):
+    """미소진 예치금 잔액 스칼라 서브쿼리 (프로필 조회와 같은 쿼리에서 잔액까지 받을 때)
+
+    Args:
+        filter_column: Deposit.profile_id 또는 Deposit.contract_profile_id
+        owner_id_column: 바깥 쿼리의 프로필 ID 컬럼
+    """
+    return (
+        select(func.coalesce(func.sum(Deposit.remaining_amount), 0))
+        .where(filter_column == owner_id_column, Deposit.is_exhausted == False)
+        .scalar_subquery()
+    )
+
+
 def deposit_fifo_use(
     db: Session,
     filter_column,
@@ -52,14 +69,12 @@ def deposit_fifo_use(
         filter_column: Deposit.profile_id 또는 Deposit.contract_profile_id
         filter_value: 해당 컬럼의 값
     """
-    deposits = (
-        db.query(Deposit)
+    # 잔액 합계는 DB에서 집계하고, 예치금 행은 충전일 순으로 필요한 만큼만 읽음
+    total_available = (
+        db.query(func.sum(Deposit.remaining_amount))
         .filter(filter_column == filter_value, Deposit.is_exhausted == False)
-        .order_by(Deposit.deposit_date)
-        .all()
-    )
-
-    total_available = sum(d.remaining_amount for d in deposits)
+        .scalar()
+    ) or 0
     if amount > total_available:
         raise HTTPException(
             status_code=400,
@@ -68,7 +83,22 @@ def deposit_fifo_use(
 
     remaining_to_use = amount
     usages_created = []
+    # 사용 내역 INSERT / 예치금 UPDATE는 루프에서 모아 각각 한 번의 executemany로 반영
+    usage_rows = []
+    deposit_updates = []
 
+    deposits = (
+        db.query(
+            Deposit.id,
+            Deposit.deposit_date,
+            Deposit.remaining_amount,
+            Deposit.currency,
+            Deposit.exchange_rate,
+        )
+        .filter(filter_column == filter_value, Deposit.is_exhausted == False)
+        .order_by(Deposit.deposit_date)
+        .yield_per(_FIFO_BATCH_SIZE)
+    )
     for deposit in deposits:
         if remaining_to_use <= 0:
             break
@@ -79,22 +109,24 @@ def deposit_fifo_use(
         if deposit.currency != "KRW" and deposit.exchange_rate:
             amount_krw = round_decimal(use_from_this * deposit.exchange_rate, 0)
 
-        usage = DepositUsage(
-            deposit_id=deposit.id,
-            usage_date=usage_date,
-            amount=use_from_this,
-            amount_krw=amount_krw,
-            billing_cycle=billing_cycle,
-            slip_batch_id=slip_batch_id,
-            uid=uid,
-            description=description,
+        usage_rows.append(
+            {
+                "deposit_id": deposit.id,
+                "usage_date": usage_date,
+                "amount": use_from_this,
+                "amount_krw": amount_krw,
+                "billing_cycle": billing_cycle,
+                "slip_batch_id": slip_batch_id,
+                "uid": uid,
+                "description": description,
+            }
         )
-        db.add(usage)
 
-        deposit.remaining_amount -= use_from_this
-        if deposit.remaining_amount <= 0:
-            deposit.remaining_amount = 0
-            deposit.is_exhausted = True
+        new_remaining = deposit.remaining_amount - use_from_this
+        if new_remaining <= 0:
+            deposit_updates.append({"id": deposit.id, "remaining_amount": 0, "is_exhausted": True})
+        else:
+            deposit_updates.append({"id": deposit.id, "remaining_amount": new_remaining})
 
         usages_created.append(
             {
@@ -108,13 +140,14 @@ def deposit_fifo_use(
 
         remaining_to_use -= use_from_this
 
+    if usage_rows:
+        db.execute(insert(DepositUsage), usage_rows)
+        # PK 기준 ORM bulk UPDATE - 소진 여부가 바뀐 행과 아닌 행은 SET 목록별로 묶여 실행됨
+        db.execute(update(Deposit), deposit_updates)
     db.commit()
 
-    new_balance = (
-        db.query(func.sum(Deposit.remaining_amount))
-        .filter(filter_column == filter_value, Deposit.is_exhausted == False)
-        .scalar()
-    ) or 0
+    # 같은 조건의 잔액 합계에서 이번에 사용한 금액만 빼면 되므로 잔액을 다시 집계하지 않음
+    new_balance = total_available - (amount - remaining_to_use)
 
     return {
         "success": True,
@@ -130,17 +163,15 @@ def get_deposit_balance_info(
     filter_value: int,
 ) -> dict:
     """통화별 예치금 잔액 조회 (공통 로직)"""
-    deposits = (
-        db.query(Deposit).filter(filter_column == filter_value, Deposit.is_exhausted == False).all()
+    # 예치금 행을 모두 로드하지 않고 통화별로 DB에서 집계
+    rows = (
+        db.query(Deposit.currency, func.sum(Deposit.remaining_amount), func.count(Deposit.id))
+        .filter(filter_column == filter_value, Deposit.is_exhausted == False)
+        .group_by(Deposit.currency)
+        .all()
     )
 
-    balance_by_currency = {}
-    for d in deposits:
-        if d.currency not in balance_by_currency:
-            balance_by_currency[d.currency] = 0
-        balance_by_currency[d.currency] += d.remaining_amount
-
     return {
-        "balance_by_currency": {k: round_decimal(v, 2) for k, v in balance_by_currency.items()},
-        "total_deposits": len(deposits),
+        "balance_by_currency": {currency: round_decimal(total, 2) for currency, total, _ in rows},
+        "total_deposits": sum(count for _, _, count in rows),
     }
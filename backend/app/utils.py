@@ -1,18 +1,35 @@
 """공통 유틸리티 함수"""
 
+import codecs
+import io
+import math
 from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_HALF_UP, Decimal
 
+# 소수 자릿수별 quantize 단위 (매 호출마다 Decimal 거듭제곱을 하지 않도록 미리 계산)
+_QUANT = {places: Decimal(1).scaleb(-places) for places in range(7)}
+
+
+def _quant(places: int) -> Decimal:
+    return _QUANT.get(places) or Decimal(10) ** -places
+
 
 def round_decimal(value: float, places: int = 2) -> float:
     """소수점 정확한 반올림 (ROUND_HALF_UP)"""
     d = Decimal(str(value))
-    return float(d.quantize(Decimal(10) ** -places, rounding=ROUND_HALF_UP))
+    return float(d.quantize(_quant(places), rounding=ROUND_HALF_UP))
 
 
 def apply_rounding(amount: float, rule: str, decimals: int = 0) -> int | float:
     """라운딩 규칙에 따른 금액 처리"""
+    # 정수 절사/올림은 float에서 바로 계산해도 Decimal 결과와 같음 (반올림은 Decimal 경로 유지)
+    if decimals == 0:
+        if rule == "ceiling":
+            return math.ceil(amount)
+        if rule != "round_half_up":
+            return math.trunc(amount)
+
     d = Decimal(str(amount))
-    quantize_value = Decimal(10) ** -decimals
+    quantize_value = _quant(decimals)
 
     if rule == "ceiling":
         result = d.quantize(quantize_value, rounding=ROUND_CEILING)
@@ -26,7 +43,8 @@ def apply_rounding(amount: float, rule: str, decimals: int = 0) -> int | float:
 
 def parse_float(value: str) -> float:
     """문자열을 float으로 변환 (빈값/오류 시 0 반환)"""
-    if not value or value.strip() == "":
+    # 공백만 있는 값은 float()에서 ValueError로 걸러지므로 strip 검사를 따로 하지 않음
+    if not value:
         return 0.0
     try:
         return float(value.replace(",", ""))
@@ -42,25 +60,45 @@ def clean_string(value: str | None) -> str | None:
     return cleaned if cleaned else None
 
 
-def decode_csv_content(content: bytes) -> str:
-    """CSV 파일 바이트를 문자열로 디코딩합니다.
+_CSV_ENCODINGS = ("utf-8-sig", "cp949", "utf-8")
+_CSV_ENCODING_ERROR = (
+    "파일 인코딩을 감지할 수 없습니다. UTF-8 또는 CP949(EUC-KR) 형식으로 저장해 주세요."
+)
+# 인코딩 판별 시 한 번에 디코딩하는 바이트 수
+_DECODE_CHUNK_SIZE = 1 << 20
+
+
+def decode_csv_stream(content: bytes) -> io.TextIOWrapper:
+    """CSV 파일 바이트를 csv 모듈에서 바로 읽을 수 있는 텍스트 스트림으로 반환합니다.
 
     인코딩 시도 순서: utf-8-sig (BOM 포함 UTF-8) → cp949 (한국어 Windows) → utf-8
+    판별은 청크 단위로만 디코딩해 파일 전체 크기의 문자열을 만들지 않습니다.
 
     Args:
         content: 파일 바이트 데이터
 
     Returns:
-        디코딩된 문자열
+        디코딩된 텍스트 스트림
 
     Raises:
         ValueError: 지원되는 인코딩으로 디코딩에 실패한 경우
     """
-    for encoding in ("utf-8-sig", "cp949", "utf-8"):
+    return io.TextIOWrapper(io.BytesIO(content), encoding=_detect_csv_encoding(content), newline="")
+
+
+def _detect_csv_encoding(content: bytes) -> str:
+    # 순수 ASCII면 후보 인코딩 모두 같은 결과이므로 BOM 검사/재시도 없이 바로 결정
+    if content.isascii():
+        return "ascii"
+
+    view = memoryview(content)
+    for encoding in _CSV_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
         try:
-            return content.decode(encoding)
+            for start in range(0, len(view), _DECODE_CHUNK_SIZE):
+                decoder.decode(view[start : start + _DECODE_CHUNK_SIZE])
+            decoder.decode(b"", final=True)
+            return encoding
         except (UnicodeDecodeError, LookupError):
             continue
-    raise ValueError(
-        "파일 인코딩을 감지할 수 없습니다. UTF-8 또는 CP949(EUC-KR) 형식으로 저장해 주세요."
-    )
+    raise ValueError(_CSV_ENCODING_ERROR)
@@ -1,182 +1,322 @@
 """
 DB 마이그레이션 스크립트 - 누락된 컬럼 추가 및 새 테이블 생성
 """
+import os
 import sqlite3
 
-DB_PATH = "billing.db"
+# 앱과 다른 작업 디렉터리에서 실행할 때는 BILLING_DB_PATH로 DB 파일 위치 지정
+DB_PATH = os.environ.get("BILLING_DB_PATH", "billing.db")
+
+
+# 마이그레이션 대상 정의 (SQL과 출력용 이름은 모듈 로드 시 한 번만 구성)
+
+# 테이블별 누락 컬럼 추가
+_COLUMN_MIGRATIONS = [
+    # slip_configs 테이블
+    ("slip_configs", "rounding_rule", "VARCHAR(20) DEFAULT 'floor'"),
+    ("slip_configs", "hkont_sales_export", "VARCHAR(20) DEFAULT '41021020'"),
+
+    # slip_configs - 환율 규칙 (매출)
+    ("slip_configs", "exchange_rate_rule_sales", "VARCHAR(30) DEFAULT 'document_date'"),
+    ("slip_configs", "exchange_rate_type_sales", "VARCHAR(20) DEFAULT 'send_rate'"),
+
+    # slip_configs - 환율 규칙 (매입)
+    ("slip_configs", "exchange_rate_rule_purchase", "VARCHAR(30) DEFAULT 'document_date'"),
+    ("slip_configs", "exchange_rate_type_purchase", "VARCHAR(20) DEFAULT 'basic_rate'"),
+
+    # slip_configs - 환율 규칙 (해외법인)
+    ("slip_configs", "exchange_rate_rule_overseas", "VARCHAR(30) DEFAULT 'first_of_billing_month'"),
+    ("slip_configs", "exchange_rate_type_overseas", "VARCHAR(20) DEFAULT 'basic_rate'"),
+
+    # slip_configs - 일할 계산 설정
+    ("slip_configs", "pro_rata_enabled", "BOOLEAN DEFAULT 1"),
+    ("slip_configs", "pro_rata_calculation", "VARCHAR(30) DEFAULT 'calendar_days'"),
+
+    # slip_records 테이블
+    ("slip_records", "tax_code", "VARCHAR(10)"),
+    ("slip_records", "dmbtr_c", "FLOAT"),
+    ("slip_records", "source_type", "VARCHAR(30) DEFAULT 'billing'"),
+    ("slip_records", "additional_charge_id", "INTEGER"),
+    ("slip_records", "split_rule_id", "INTEGER"),
+    ("slip_records", "split_allocation_id", "INTEGER"),
+    ("slip_records", "pro_rata_ratio", "FLOAT"),
+    ("slip_records", "original_amount", "FLOAT"),
+
+    # contract_billing_profiles 테이블
+    ("contract_billing_profiles", "exchange_rate_type", "VARCHAR(20)"),
+    ("contract_billing_profiles", "custom_exchange_rate_date", "DATE"),
+    ("contract_billing_profiles", "rounding_rule_override", "VARCHAR(20)"),
+    ("contract_billing_profiles", "pro_rata_override", "VARCHAR(20)"),
+
+    # exchange_rates 테이블 (HB 환율 정보)
+    ("exchange_rates", "basic_rate", "FLOAT"),
+    ("exchange_rates", "send_rate", "FLOAT"),
+    ("exchange_rates", "buy_rate", "FLOAT"),
+    ("exchange_rates", "sell_rate", "FLOAT"),
+
+    # hb_contracts 테이블 - 계약 시작/종료일
+    ("hb_contracts", "contract_start_date", "DATE"),
+    ("hb_contracts", "contract_end_date", "DATE"),
+]
+
+# 새 테이블 생성
+_NEW_TABLES = [
+    # 추가 비용 테이블
+    """
+    CREATE TABLE IF NOT EXISTS additional_charges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        contract_seq INTEGER NOT NULL,
+        name VARCHAR(200) NOT NULL,
+        description TEXT,
+        charge_type VARCHAR(20) DEFAULT 'other',
+        amount FLOAT NOT NULL,
+        currency VARCHAR(10) DEFAULT 'USD',
+        recurrence_type VARCHAR(20) DEFAULT 'one_time',
+        start_date DATE,
+        end_date DATE,
+        applies_to_sales BOOLEAN DEFAULT 1,
+        applies_to_purchase BOOLEAN DEFAULT 0,
+        is_active BOOLEAN DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (contract_seq) REFERENCES hb_contracts(seq)
+    )
+    """,
+
+    # 분할 청구 규칙 테이블
+    """
+    CREATE TABLE IF NOT EXISTS split_billing_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_account_id VARCHAR(50) NOT NULL,
+        source_contract_seq INTEGER NOT NULL,
+        name VARCHAR(200),
+        effective_from DATE,
+        effective_to DATE,
+        is_active BOOLEAN DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (source_account_id) REFERENCES hb_vendor_accounts(id),
+        FOREIGN KEY (source_contract_seq) REFERENCES hb_contracts(seq)
+    )
+    """,
+
+    # 분할 청구 배분 테이블
+    """
+    CREATE TABLE IF NOT EXISTS split_billing_allocations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rule_id INTEGER NOT NULL,
+        target_company_seq INTEGER NOT NULL,
+        split_type VARCHAR(20) DEFAULT 'percentage',
+        split_value FLOAT NOT NULL,
+        priority INTEGER DEFAULT 0,
+        note TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (rule_id) REFERENCES split_billing_rules(id) ON DELETE CASCADE,
+        FOREIGN KEY (target_company_seq) REFERENCES hb_companies(seq)
+    )
+    """,
+
+    # 일할 계산 기간 테이블
+    """
+    CREATE TABLE IF NOT EXISTS pro_rata_periods (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        contract_seq INTEGER NOT NULL,
+        billing_cycle VARCHAR(10) NOT NULL,
+        start_day INTEGER NOT NULL,
+        end_day INTEGER NOT NULL,
+        total_days INTEGER NOT NULL,
+        active_days INTEGER NOT NULL,
+        ratio FLOAT NOT NULL,
+        is_manual BOOLEAN DEFAULT 0,
+        note TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (contract_seq) REFERENCES hb_contracts(seq)
+    )
+    """,
+
+    # 전표 배치 요약 테이블
+    """
+    CREATE TABLE IF NOT EXISTS slip_batches (
+        batch_id VARCHAR(50) PRIMARY KEY,
+        billing_cycle VARCHAR(10) NOT NULL,
+        slip_type VARCHAR(20) NOT NULL,
+        count INTEGER DEFAULT 0,
+        total_krw FLOAT DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+
+    # 외부 API 동기화 메타 테이블 (환율 조건부 요청용 ETag/Last-Modified)
+    """
+    CREATE TABLE IF NOT EXISTS sync_meta (
+        endpoint VARCHAR(200) PRIMARY KEY,
+        etag VARCHAR(200),
+        last_modified VARCHAR(100)
+    )
+    """,
+]
+# 출력용 테이블 이름 (SQL에서 미리 추출)
+_TABLE_NAMES = [
+    sql.split("CREATE TABLE IF NOT EXISTS")[1].split("(")[0].strip() for sql in _NEW_TABLES
+]
+
+# 인덱스 생성
+_INDEXES = [
+    (
+        "CREATE INDEX IF NOT EXISTS ix_deposits_contract_fifo "
+        "ON deposits(contract_profile_id, deposit_date) WHERE is_exhausted = 0"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS ix_deposits_profile_fifo "
+        "ON deposits(profile_id, deposit_date) WHERE is_exhausted = 0"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS idx_additional_charges_contract "
+        "ON additional_charges(contract_seq)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS ix_additional_charges_active_period "
+        "ON additional_charges(contract_seq, start_date, end_date) WHERE is_active = 1"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS ix_split_rule_account_active "
+        "ON split_billing_rules(source_account_id, is_active, effective_from, effective_to)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS idx_split_rules_contract "
+        "ON split_billing_rules(source_contract_seq)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS ix_alloc_rule_prio "
+        "ON split_billing_allocations(rule_id, priority, id)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS idx_split_alloc_company "
+        "ON split_billing_allocations(target_company_seq)"
+    ),
+    "CREATE INDEX IF NOT EXISTS idx_pro_rata_cycle ON pro_rata_periods(billing_cycle)",
+    # 기존 DB에 중복 기간이 남아 있을 수 있어 고유 제약 없이 생성
+    "CREATE INDEX IF NOT EXISTS ix_prorata_lookup ON pro_rata_periods(contract_seq, billing_cycle)",
+    "CREATE INDEX IF NOT EXISTS ix_slip_batches_created_at ON slip_batches(created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_slip_batch_seq ON slip_records(batch_id, seqno)",
+    "CREATE INDEX IF NOT EXISTS ix_slip_cycle_type ON slip_records(billing_cycle, slip_type)",
+    "CREATE INDEX IF NOT EXISTS ix_slip_batch_partner ON slip_records(batch_id, partner)",
+    # 수동 등록 API로 같은 일자 환율이 중복될 수 있어 고유 제약 없이 생성
+    (
+        "CREATE INDEX IF NOT EXISTS ix_exchange_rates_lookup "
+        "ON exchange_rates(currency_from, currency_to, rate_date)"
+    ),
+]
+# 출력용 인덱스 이름 (SQL에서 미리 추출)
+_INDEX_NAMES = [
+    sql.split("CREATE INDEX IF NOT EXISTS")[1].split("ON")[0].strip() for sql in _INDEXES
+]
+
+# 복합 인덱스의 선두 컬럼과 겹치는 단일 컬럼 인덱스 (쓰기 시 갱신할 인덱스 수 감소)
+_REDUNDANT_INDEXES = [
+    "ix_split_billing_rules_source_account_id",  # → ix_split_rule_account_active
+    "idx_split_rules_account",
+    "ix_split_billing_allocations_rule_id",  # → ix_alloc_rule_prio
+    "idx_split_alloc_rule",
+    "ix_pro_rata_periods_contract_seq",  # → ix_prorata_lookup
+    "idx_pro_rata_contract",
+    "ix_slip_records_batch_id",  # → ix_slip_batch_seq
+    "ix_slip_records_billing_cycle",  # → ix_slip_cycle_type
+    "ix_slip_records_slip_type",  # 매출/매입 2종뿐이라 단독 인덱스는 선택도 없음
+]
 
 
 def migrate():
-    conn = sqlite3.connect(DB_PATH)
+    # 자동 커밋 모드로 열고 전체 DDL을 한 트랜잭션으로 묶음 (문장마다 커밋/fsync 하지 않음)
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
     cursor = conn.cursor()
+    # journal_mode=WAL은 DB 파일에 유지되어 앱 연결에도 적용, 나머지는 이 연결에만 적용
+    # (트랜잭션 밖에서 실행해야 하므로 BEGIN 전에 설정)
+    cursor.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-200000;
+        """
+    )
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        migrate_schema(cursor)
+        # 데이터 적재 후 인덱스를 만드는 편이 빠르므로 인덱스는 스키마와 분리해 마지막에 적용
+        migrate_indexes(cursor)
+        cursor.execute("COMMIT")
+    except BaseException:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    print("\nMigration completed!")
+
+
+def migrate_schema(cursor: sqlite3.Cursor):
+    """누락 컬럼/새 테이블 추가 및 배치 요약 백필 (트랜잭션은 호출하는 쪽에서 관리)
 
-    # 테이블별 누락 컬럼 추가
-    migrations = [
-        # slip_configs 테이블
-        ("slip_configs", "rounding_rule", "VARCHAR(20) DEFAULT 'floor'"),
-        ("slip_configs", "hkont_sales_export", "VARCHAR(20) DEFAULT '41021020'"),
-
-        # slip_configs - 환율 규칙 (매출)
-        ("slip_configs", "exchange_rate_rule_sales", "VARCHAR(30) DEFAULT 'document_date'"),
-        ("slip_configs", "exchange_rate_type_sales", "VARCHAR(20) DEFAULT 'send_rate'"),
-
-        # slip_configs - 환율 규칙 (매입)
-        ("slip_configs", "exchange_rate_rule_purchase", "VARCHAR(30) DEFAULT 'document_date'"),
-        ("slip_configs", "exchange_rate_type_purchase", "VARCHAR(20) DEFAULT 'basic_rate'"),
-
-        # slip_configs - 환율 규칙 (해외법인)
-        ("slip_configs", "exchange_rate_rule_overseas", "VARCHAR(30) DEFAULT 'first_of_billing_month'"),
-        ("slip_configs", "exchange_rate_type_overseas", "VARCHAR(20) DEFAULT 'basic_rate'"),
-
-        # slip_configs - 일할 계산 설정
-        ("slip_configs", "pro_rata_enabled", "BOOLEAN DEFAULT 1"),
-        ("slip_configs", "pro_rata_calculation", "VARCHAR(30) DEFAULT 'calendar_days'"),
-
-        # slip_records 테이블
-        ("slip_records", "tax_code", "VARCHAR(10)"),
-        ("slip_records", "dmbtr_c", "FLOAT"),
-        ("slip_records", "source_type", "VARCHAR(30) DEFAULT 'billing'"),
-        ("slip_records", "additional_charge_id", "INTEGER"),
-        ("slip_records", "split_rule_id", "INTEGER"),
-        ("slip_records", "split_allocation_id", "INTEGER"),
-        ("slip_records", "pro_rata_ratio", "FLOAT"),
-        ("slip_records", "original_amount", "FLOAT"),
-
-        # contract_billing_profiles 테이블
-        ("contract_billing_profiles", "exchange_rate_type", "VARCHAR(20)"),
-        ("contract_billing_profiles", "custom_exchange_rate_date", "DATE"),
-        ("contract_billing_profiles", "rounding_rule_override", "VARCHAR(20)"),
-        ("contract_billing_profiles", "pro_rata_override", "VARCHAR(20)"),
-
-        # exchange_rates 테이블 (HB 환율 정보)
-        ("exchange_rates", "basic_rate", "FLOAT"),
-        ("exchange_rates", "send_rate", "FLOAT"),
-        ("exchange_rates", "buy_rate", "FLOAT"),
-        ("exchange_rates", "sell_rate", "FLOAT"),
-
-        # hb_contracts 테이블 - 계약 시작/종료일
-        ("hb_contracts", "contract_start_date", "DATE"),
-        ("hb_contracts", "contract_end_date", "DATE"),
-    ]
-
-    for table, column, col_type in migrations:
+    중복 컬럼 등 개별 문장 오류는 SQLite가 해당 문장만 취소하므로 트랜잭션은 계속 진행됨
+    """
+    # 테이블별 기존 컬럼을 한 번씩만 조회해 이미 있는 컬럼은 ALTER를 시도하지 않음
+    existing_columns: dict[str, set[str]] = {}
+    for table in dict.fromkeys(table for table, _, _ in _COLUMN_MIGRATIONS):
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing_columns[table] = {row[1] for row in cursor.fetchall()}
+
+    for table, column, col_type in _COLUMN_MIGRATIONS:
+        if column in existing_columns[table]:
+            print(f"Column {column} already exists in {table}")
+            continue
         try:
             cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
             print(f"Added {column} to {table}")
         except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e):
-                print(f"Column {column} already exists in {table}")
-            else:
-                print(f"Error adding {column} to {table}: {e}")
+            print(f"Error adding {column} to {table}: {e}")
 
     # 새 테이블 생성
-    new_tables = [
-        # 추가 비용 테이블
-        """
-        CREATE TABLE IF NOT EXISTS additional_charges (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            contract_seq INTEGER NOT NULL,
-            name VARCHAR(200) NOT NULL,
-            description TEXT,
-            charge_type VARCHAR(20) DEFAULT 'other',
-            amount FLOAT NOT NULL,
-            currency VARCHAR(10) DEFAULT 'USD',
-            recurrence_type VARCHAR(20) DEFAULT 'one_time',
-            start_date DATE,
-            end_date DATE,
-            applies_to_sales BOOLEAN DEFAULT 1,
-            applies_to_purchase BOOLEAN DEFAULT 0,
-            is_active BOOLEAN DEFAULT 1,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (contract_seq) REFERENCES hb_contracts(seq)
-        )
-        """,
-
-        # 분할 청구 규칙 테이블
-        """
-        CREATE TABLE IF NOT EXISTS split_billing_rules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            source_account_id VARCHAR(50) NOT NULL,
-            source_contract_seq INTEGER NOT NULL,
-            name VARCHAR(200),
-            effective_from DATE,
-            effective_to DATE,
-            is_active BOOLEAN DEFAULT 1,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (source_account_id) REFERENCES hb_vendor_accounts(id),
-            FOREIGN KEY (source_contract_seq) REFERENCES hb_contracts(seq)
-        )
-        """,
-
-        # 분할 청구 배분 테이블
-        """
-        CREATE TABLE IF NOT EXISTS split_billing_allocations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rule_id INTEGER NOT NULL,
-            target_company_seq INTEGER NOT NULL,
-            split_type VARCHAR(20) DEFAULT 'percentage',
-            split_value FLOAT NOT NULL,
-            priority INTEGER DEFAULT 0,
-            note TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (rule_id) REFERENCES split_billing_rules(id) ON DELETE CASCADE,
-            FOREIGN KEY (target_company_seq) REFERENCES hb_companies(seq)
-        )
-        """,
-
-        # 일할 계산 기간 테이블
-        """
-        CREATE TABLE IF NOT EXISTS pro_rata_periods (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            contract_seq INTEGER NOT NULL,
-            billing_cycle VARCHAR(10) NOT NULL,
-            start_day INTEGER NOT NULL,
-            end_day INTEGER NOT NULL,
-            total_days INTEGER NOT NULL,
-            active_days INTEGER NOT NULL,
-            ratio FLOAT NOT NULL,
-            is_manual BOOLEAN DEFAULT 0,
-            note TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (contract_seq) REFERENCES hb_contracts(seq)
-        )
-        """,
-    ]
-
-    for table_sql in new_tables:
+    for table_sql, table_name in zip(_NEW_TABLES, _TABLE_NAMES):
         try:
             cursor.execute(table_sql)
-            # 테이블 이름 추출
-            table_name = table_sql.split("CREATE TABLE IF NOT EXISTS")[1].split("(")[0].strip()
             print(f"Created table {table_name}")
         except sqlite3.OperationalError as e:
             print(f"Error creating table: {e}")
 
-    # 인덱스 생성
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_additional_charges_contract ON additional_charges(contract_seq)",
-        "CREATE INDEX IF NOT EXISTS idx_split_rules_account ON split_billing_rules(source_account_id)",
-        "CREATE INDEX IF NOT EXISTS idx_split_rules_contract ON split_billing_rules(source_contract_seq)",
-        "CREATE INDEX IF NOT EXISTS idx_split_alloc_rule ON split_billing_allocations(rule_id)",
-        "CREATE INDEX IF NOT EXISTS idx_split_alloc_company ON split_billing_allocations(target_company_seq)",
-        "CREATE INDEX IF NOT EXISTS idx_pro_rata_contract ON pro_rata_periods(contract_seq)",
-        "CREATE INDEX IF NOT EXISTS idx_pro_rata_cycle ON pro_rata_periods(billing_cycle)",
-    ]
-
-    for index_sql in indexes:
+    # 기존 전표로 배치 요약 채우기
+    try:
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO slip_batches
+                (batch_id, billing_cycle, slip_type, count, total_krw, created_at)
+            SELECT batch_id, MIN(billing_cycle), MIN(slip_type), COUNT(id),
+                   COALESCE(SUM(wrbtr), 0), MIN(created_at)
+            FROM slip_records
+            GROUP BY batch_id
+            """
+        )
+        print(f"Backfilled {cursor.rowcount} slip batches")
+    except sqlite3.OperationalError as e:
+        print(f"Error backfilling slip batches: {e}")
+
+
+def migrate_indexes(cursor: sqlite3.Cursor):
+    """인덱스 생성 및 중복 인덱스 제거
+
+    대량 적재가 있다면 적재를 마친 뒤 호출 (인덱스가 있으면 행마다 B-tree 갱신 비용이 듦)
+    """
+    for index_sql, idx_name in zip(_INDEXES, _INDEX_NAMES):
         try:
             cursor.execute(index_sql)
-            idx_name = index_sql.split("CREATE INDEX IF NOT EXISTS")[1].split("ON")[0].strip()
             print(f"Created index {idx_name}")
         except sqlite3.OperationalError as e:
             print(f"Error creating index: {e}")
 
-    conn.commit()
-    conn.close()
-    print("\nMigration completed!")
+    # 복합 인덱스와 겹치는 단일 컬럼 인덱스 제거
+    for idx_name in _REDUNDANT_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {idx_name}")
+    print(f"Dropped redundant indexes: {', '.join(_REDUNDANT_INDEXES)}")
 
 
 if __name__ == "__main__":
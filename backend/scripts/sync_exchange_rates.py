@@ -13,39 +13,98 @@ import argparse
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
 
 # 프로젝트 루트를 path에 추가
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal
-from app.models.slip import ExchangeRate
+from app.models.slip import ExchangeRate, SyncMeta
 
 
 # HB API 설정
 HB_API_URL = "https://alibabacloud.hyperbilling.kr/admin/api/v1/ccy/exchangerate"
-HB_COOKIE = "connect.sid=s%3AF6rpskNNDIRY7bSFJtOI17WKw6sJP_88.io0TefWAC56UJEXNIM51lg1%2BWTbZagMP6HPNzqtpQAw"
+# 세션 쿠키는 HB_COOKIE 환경 변수로 교체 가능 (미설정 시 기본값 사용)
+HB_COOKIE = os.environ.get(
+    "HB_COOKIE",
+    "connect.sid=s%3AF6rpskNNDIRY7bSFJtOI17WKw6sJP_88.io0TefWAC56UJEXNIM51lg1%2BWTbZagMP6HPNzqtpQAw",
+)
+
+# 여러 통화를 동시에 조회할 때 최대 동시 요청 수 (세션 커넥션 풀 크기와 맞춤)
+_MAX_FETCH_WORKERS = 8
+
+# HB API 세션 (호출 간 keep-alive 연결 재사용, 일시적 게이트웨이 오류는 재시도)
+_SESSION = requests.Session()
+_SESSION.headers.update({"Cookie": HB_COOKIE})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=_MAX_FETCH_WORKERS,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    ),
+)
+
+
+# 기존 환율 미리 조회 시 한 번의 IN 쿼리에 넣는 일자 수
+_PREFETCH_CHUNK_SIZE = 500
+
+# 동기화로 갱신되는 환율 컬럼 (변경 여부 비교 대상)
+_RATE_COLUMNS = (
+    ExchangeRate.rate,
+    ExchangeRate.basic_rate,
+    ExchangeRate.send_rate,
+    ExchangeRate.buy_rate,
+    ExchangeRate.sell_rate,
+    ExchangeRate.source,
+)
+
+
+def _parse_rate_date(value: str) -> date:
+    """환율 일자 파싱 (YYYY-MM-DD는 fromisoformat, 그 외 형식은 strptime으로 처리)"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
 
+def fetch_exchange_rates_from_hb(
+    limit: int = 31, code: str = "USD", validators: dict | None = None
+) -> list[dict] | None:
+    """HB API에서 환율 데이터 가져오기
 
-def fetch_exchange_rates_from_hb(limit: int = 31) -> list[dict]:
-    """HB API에서 환율 데이터 가져오기"""
+    validators에 지난 응답의 ETag/Last-Modified가 있으면 조건부 요청을 보내고,
+    변경이 없으면(304) None을 반환. 200 응답이면 새 검증값으로 validators를 갱신
+    """
     params = {
         "page": 1,
         "sort": "-date",
         "limit": limit,
         "withCountAll": "true",
-        "code": "USD",
-    }
-    headers = {
-        "Cookie": HB_COOKIE,
+        "code": code,
     }
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
 
     try:
-        response = requests.get(HB_API_URL, params=params, headers=headers, timeout=30)
+        response = _SESSION.get(HB_API_URL, params=params, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return None
         response.raise_for_status()
         data = response.json()
+        if validators is not None:
+            validators["etag"] = response.headers.get("ETag")
+            validators["last_modified"] = response.headers.get("Last-Modified")
 
         # API 응답 구조: data.rows[] 또는 data.data.rows[]
         if data.get("success"):
@@ -60,6 +119,65 @@ def fetch_exchange_rates_from_hb(limit: int = 31) -> list[dict]:
         return []
 
 
+def fetch_multi_currency_rates_from_hb(
+    limit: int, currencies: list[str], validators: dict[str, dict] | None = None
+) -> list[dict] | None:
+    """여러 통화의 환율을 HB API에서 동시에 가져오기 (통화별 요청은 스레드로 병렬화)
+
+    새로 받은 데이터 없이 변경 없음(304)인 통화만 있으면 None 반환 (나머지 통화 실패 포함)
+    """
+
+    def fetch(code: str) -> list[dict] | None:
+        code_validators = validators.get(code) if validators is not None else None
+        return fetch_exchange_rates_from_hb(limit, code=code, validators=code_validators)
+
+    if len(currencies) == 1:
+        results = [fetch(currencies[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(_MAX_FETCH_WORKERS, len(currencies))) as ex:
+            results = list(ex.map(fetch, currencies))
+
+    if all(code_rows is None for code_rows in results):
+        return None
+    if None in results and not any(results):
+        # 일부는 304, 나머지는 실패/빈 응답 - 전체 실패가 아니므로 JSON fallback 하지 않음
+        failed = [code for code, code_rows in zip(currencies, results) if code_rows is not None]
+        print(f"[WARN] 환율 조회 실패/데이터 없음: {', '.join(failed)} (나머지는 변경 없음)")
+        return None
+
+    rows = []
+    for code, code_rows in zip(currencies, results):
+        for row in code_rows or []:
+            # 응답에 통화 코드가 없으면 요청한 통화로 채움 (저장 시 기본값 USD로 섞이지 않도록)
+            row.setdefault("code", code)
+            rows.append(row)
+    return rows
+
+
+def _sync_meta_key(code: str, limit: int) -> str:
+    # 통화/조회 기간이 다르면 응답도 달라지므로 요청 조건별로 검증값을 따로 보관
+    return f"hb_exchange_rate:{code}:{limit}"
+
+
+def load_hb_validators(currencies: list[str], limit: int) -> dict[str, dict] | None:
+    """통화별로 저장된 ETag/Last-Modified 조회 (sync_meta 테이블이 없으면 None)"""
+    keys = {_sync_meta_key(code, limit): code for code in currencies}
+    db = SessionLocal()
+    try:
+        saved = {
+            keys[endpoint]: {"etag": etag, "last_modified": last_modified}
+            for endpoint, etag, last_modified in db.query(
+                SyncMeta.endpoint, SyncMeta.etag, SyncMeta.last_modified
+            ).filter(SyncMeta.endpoint.in_(keys))
+        }
+    except SQLAlchemyError as e:
+        print(f"[WARN] sync_meta 조회 실패, 조건부 요청 없이 진행: {e}")
+        return None
+    finally:
+        db.close()
+    return {code: saved.get(code, {}) for code in currencies}
+
+
 def fetch_exchange_rates_from_json() -> list[dict]:
     """JSON 파일에서 환율 데이터 가져오기 (fallback)"""
     json_path = os.path.join(
@@ -76,17 +194,30 @@ def fetch_exchange_rates_from_json() -> list[dict]:
     return data.get("data", {}).get("data", {}).get("rows", [])
 
 
-def sync_exchange_rates(use_api: bool = True, limit: int = 31):
-    """환율 데이터 동기화"""
+def sync_exchange_rates(use_api: bool = True, limit: int = 31, currencies: list[str] | None = None):
+    """환율 데이터 동기화 (currencies 지정 시 통화별로 동시에 조회)"""
     print(f"[INFO] 환율 동기화 시작 - {datetime.now().isoformat()}")
 
     # 데이터 가져오기
+    validators = None
     if use_api:
         print("[INFO] HB API에서 환율 데이터 가져오기...")
-        rows = fetch_exchange_rates_from_hb(limit)
+        validators = load_hb_validators(currencies or ["USD"], limit)
+        if currencies:
+            rows = fetch_multi_currency_rates_from_hb(limit, currencies, validators)
+        else:
+            rows = fetch_exchange_rates_from_hb(
+                limit, validators=validators["USD"] if validators else None
+            )
+        if rows is None:
+            # 지난 동기화 이후 변경 없음 - DB 작업 없이 종료
+            print("[INFO] 변경 없음 (304), 동기화 생략")
+            return {"success": True, "unchanged": True}
         if not rows:
             print("[WARN] API 실패, JSON 파일로 fallback...")
             rows = fetch_exchange_rates_from_json()
+            # fallback 데이터로 저장한 경우 API 검증값은 남기지 않음
+            validators = None
     else:
         print("[INFO] JSON 파일에서 환율 데이터 가져오기...")
         rows = fetch_exchange_rates_from_json()
@@ -99,58 +230,90 @@ def sync_exchange_rates(use_api: bool = True, limit: int = 31):
     db = SessionLocal()
     imported = 0
     updated = 0
+    skipped = 0
 
     try:
-        for row in rows:
-            rate_date_str = row.get("date")
-            if not rate_date_str:
-                continue
-
-            rate_date = datetime.strptime(rate_date_str, "%Y-%m-%d").date()
-            currency_code = row.get("code", "USD")
-
-            # 기존 데이터 확인
-            existing = (
-                db.query(ExchangeRate)
+        parsed_rows = [
+            (_parse_rate_date(row["date"]), row.get("code", "USD"), row)
+            for row in rows
+            if row.get("date")
+        ]
+
+        # 기존 데이터를 행마다 조회하지 않고 한 번의 IN 쿼리로 (일자, 통화) 기준 미리 로드
+        # (값이 같은 행은 UPDATE를 건너뛰도록 현재 환율 값도 함께 보관)
+        existing: dict[tuple[date, str], tuple[int, tuple]] = {}
+        rate_dates = sorted({rate_date for rate_date, _, _ in parsed_rows})
+        currency_codes = {code for _, code, _ in parsed_rows}
+        # --days가 크면 IN 목록이 SQLite 바인드 변수 한도를 넘지 않도록 일자 단위로 나눠 조회
+        for start in range(0, len(rate_dates), _PREFETCH_CHUNK_SIZE):
+            for rate_id, rate_date, currency_code, *current in (
+                db.query(
+                    ExchangeRate.id,
+                    ExchangeRate.rate_date,
+                    ExchangeRate.currency_from,
+                    *_RATE_COLUMNS,
+                )
                 .filter(
-                    ExchangeRate.rate_date == rate_date,
-                    ExchangeRate.currency_from == currency_code,
+                    ExchangeRate.rate_date.in_(rate_dates[start : start + _PREFETCH_CHUNK_SIZE]),
+                    ExchangeRate.currency_from.in_(currency_codes),
                     ExchangeRate.currency_to == "KRW",
                 )
-                .first()
-            )
-
+                .order_by(ExchangeRate.id)
+            ):
+                existing.setdefault((rate_date, currency_code), (rate_id, tuple(current)))
+
+        # ORM 객체 대신 값만 모아 INSERT / PK 기준 UPDATE를 각각 한 번에 실행
+        new_rows: dict[tuple[date, str], dict] = {}
+        update_rows: dict[int, dict] = {}
+        for rate_date, currency_code, row in parsed_rows:
             basic_rate = float(row.get("basic_rate", 0))
-            send_rate = float(row.get("send_rate", 0))
-            buy_rate = float(row.get("buy_rate", 0))
-            sell_rate = float(row.get("sell_rate", 0))
-
-            if existing:
-                existing.rate = basic_rate
-                existing.basic_rate = basic_rate
-                existing.send_rate = send_rate
-                existing.buy_rate = buy_rate
-                existing.sell_rate = sell_rate
-                existing.source = "hb"
+            values = {
+                "rate": basic_rate,
+                "basic_rate": basic_rate,
+                "send_rate": float(row.get("send_rate", 0)),
+                "buy_rate": float(row.get("buy_rate", 0)),
+                "sell_rate": float(row.get("sell_rate", 0)),
+                "source": "hb",
+            }
+
+            key = (rate_date, currency_code)
+            if key in existing:
+                rate_id, current = existing[key]
+                if current == tuple(values[column.key] for column in _RATE_COLUMNS):
+                    # 변경 없는 행은 UPDATE 대상에서 제외 (같은 응답의 앞선 갱신도 되돌림)
+                    update_rows.pop(rate_id, None)
+                    skipped += 1
+                    continue
+                update_rows[rate_id] = {"id": rate_id, **values}
+            elif key in new_rows:
+                # 같은 응답에 같은 일자가 다시 나오면 새로 추가할 행을 갱신
+                new_rows[key].update(values)
                 updated += 1
             else:
-                new_rate = ExchangeRate(
-                    rate_date=rate_date,
-                    currency_from=currency_code,
-                    currency_to="KRW",
-                    rate=basic_rate,
-                    basic_rate=basic_rate,
-                    send_rate=send_rate,
-                    buy_rate=buy_rate,
-                    sell_rate=sell_rate,
-                    source="hb",
-                )
-                db.add(new_rate)
+                new_rows[key] = {
+                    "rate_date": rate_date,
+                    "currency_from": currency_code,
+                    "currency_to": "KRW",
+                    **values,
+                }
                 imported += 1
 
+        # 기존 행 갱신 건수는 실제 UPDATE 대상 기준 (같은 응답 안에서 되돌린 갱신은 제외)
+        updated += len(update_rows)
+
+        if new_rows:
+            db.execute(insert(ExchangeRate), list(new_rows.values()))
+        if update_rows:
+            db.execute(update(ExchangeRate), list(update_rows.values()))
+
+        # 환율과 같은 트랜잭션으로 검증값 저장 (저장 실패 시 다음 실행에서 다시 전체 조회)
+        for code, code_validators in (validators or {}).items():
+            if code_validators.get("etag") or code_validators.get("last_modified"):
+                db.merge(SyncMeta(endpoint=_sync_meta_key(code, limit), **code_validators))
+
         db.commit()
-        print(f"[INFO] 동기화 완료 - 신규: {imported}, 업데이트: {updated}")
-        return {"success": True, "imported": imported, "updated": updated}
+        print(f"[INFO] 동기화 완료 - 신규: {imported}, 업데이트: {updated}, 변경 없음: {skipped}")
+        return {"success": True, "imported": imported, "updated": updated, "skipped": skipped}
 
     except Exception as e:
         db.rollback()
@@ -168,9 +331,14 @@ def main():
     parser.add_argument(
         "--json-only", action="store_true", help="API 대신 JSON 파일만 사용"
     )
+    parser.add_argument(
+        "--currencies", nargs="+", help="조회할 통화 코드 목록 (기본: USD, 예: USD JPY EUR)"
+    )
     args = parser.parse_args()
 
-    result = sync_exchange_rates(use_api=not args.json_only, limit=args.days)
+    result = sync_exchange_rates(
+        use_api=not args.json_only, limit=args.days, currencies=args.currencies
+    )
     print(f"[RESULT] {result}")
 
 
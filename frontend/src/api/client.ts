@@ -286,7 +286,8 @@ export const slipApi = {
     slip_type?: string;
     has_bp?: boolean;
     limit?: number;
-    offset?: number;
+    cursor?: number;
+    include_total?: boolean;
   }) => api.get('/slip/', { params }),
   getBatches: () => api.get('/slip/batches'),
   updateSlip: (slipId: number, data: { partner?: string; wrbtr?: number; zzsconid?: string }) =>
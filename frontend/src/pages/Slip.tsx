@@ -173,7 +173,7 @@ export default function Slip() {
     queryKey: ['slips', selectedBatch],
     queryFn: () =>
       slipApi
-        .getSlips({ batch_id: selectedBatch!, limit: 500 })
+        .getSlips({ batch_id: selectedBatch!, limit: 500, include_total: true })
         .then((res) => res.data as { total: number; data: SlipRecord[] }),
     enabled: !!selectedBatch,
   });